@@ -1,27 +1,92 @@
-from typing import Dict
-from .extract_database import extract_erp
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Tuple
+from .extract_database import extract_erp, CHUNK_SIZE
 from .extract_web import extract_scraper
 from .extract_local import extract_locale
 from .extract_images import extract_ocr
 
-def extract(ENV_KEYS: Dict[str, str | None]) -> None:
-    print("EXTRACTING DATABASE")
-    extract_erp(
-        ENV_KEYS.get("DB_HOST"),
-        ENV_KEYS.get("DB_NAME"),
-        ENV_KEYS.get("DB_USERNAME"),
-        ENV_KEYS.get("DB_PASSWORD")
-    )
-    print("DONE EXTRACTING DATABASE")
-
-    print("EXTRACTING WEBSITE")
-    extract_scraper(ENV_KEYS.get("WEBSITE"))
-    print("DONE EXTRACTING WEBSITE")
-
-    print("EXTRACTING LOCAL FILES")
-    extract_locale()
-    print("DONE EXTRACTING LOCAL FILES")
-
-    print("EXTRACTING IMAGES")
-    extract_ocr()
-    print("DONE EXTRACTING LOCAL FILES")
\ No newline at end of file
+def extract(ENV_KEYS: Dict[str, str | None], parallel: bool | None = None) -> Dict[str, str]:
+    if parallel is None:
+        parallel=(ENV_KEYS.get("EXTRACT_PARALLEL") or "").lower() in ("1","true","yes")
+
+    def database() -> None:
+        failures=extract_erp(
+            ENV_KEYS.get("DB_HOST"),
+            ENV_KEYS.get("DB_NAME"),
+            ENV_KEYS.get("DB_USERNAME"),
+            ENV_KEYS.get("DB_PASSWORD"),
+            chunk_size=int(ENV_KEYS.get("ERP_CHUNK_SIZE") or CHUNK_SIZE),
+            workers=int(ENV_KEYS.get("ERP_WORKERS") or 1),
+            incremental=(ENV_KEYS.get("ERP_INCREMENTAL") or "").lower() in ("1","true","yes")
+        )
+        if failures:
+            raise RuntimeError(f"tables failed: {', '.join(failures)}")
+
+    def website() -> None:
+        extract_scraper(
+            ENV_KEYS.get("WEBSITE"),
+            asynchronous=(ENV_KEYS.get("SCRAPER_ASYNC") or "").lower() in ("1","true","yes")
+        )
+
+    def local_files() -> None:
+        extract_locale(
+            ENV_KEYS.get("FILES_PATH") or "./data",
+            files=[name.strip() for name in (ENV_KEYS.get("LOCAL_FILES") or "").split(",") if name.strip()] or None
+        )
+
+    ocr_workers=int(ENV_KEYS.get("OCR_WORKERS") or 0) or None
+
+    sources: Dict[str, Callable[[], None]]={
+        "DATABASE": database,
+        "WEBSITE": website,
+        "LOCAL FILES": local_files,
+    }
+
+    results: Dict[str, Tuple[float, str | None]]={}
+    if not parallel:
+        for name,source in sources.items():
+            print(f"EXTRACTING {name}")
+            results[name]=run_source(source)
+            print(f"DONE EXTRACTING {name}")
+
+        print("EXTRACTING IMAGES")
+        results["IMAGES"]=run_source(lambda: extract_ocr(workers=ocr_workers))
+        print("DONE EXTRACTING IMAGES")
+    else:
+        print("EXTRACTING ALL SOURCES")
+        start=time.perf_counter()
+        # network/disk-bound sources share threads, OCR is CPU-bound and gets
+        # its own process (which fans out to its own worker pool)
+        with ThreadPoolExecutor(max_workers=len(sources)) as threads, ProcessPoolExecutor(max_workers=1) as processes:
+            futures: Dict[str, Future]={
+                "IMAGES": processes.submit(extract_ocr,workers=ocr_workers),
+            }
+            for name,source in sources.items():
+                futures[name]=threads.submit(run_source,source)
+
+            for name,future in futures.items():
+                if name=="IMAGES":
+                    try:
+                        future.result()
+                        results[name]=(time.perf_counter()-start,None)
+                    except Exception as e:
+                        results[name]=(time.perf_counter()-start,f"{type(e).__name__}: {e}")
+                else:
+                    results[name]=future.result()
+        print("DONE EXTRACTING ALL SOURCES")
+
+    print("EXTRACT SUMMARY")
+    for name,(seconds,error) in results.items():
+        status="OK" if error is None else f"FAILED ({error})"
+        print(f"  {name:<12} {seconds:8.2f}s  {status}")
+
+    return {name: error for name,(_,error) in results.items() if error is not None}
+
+def run_source(source: Callable[[], None]) -> Tuple[float, str | None]:
+    start=time.perf_counter()
+    try:
+        source()
+        return time.perf_counter()-start,None
+    except Exception as e:
+        return time.perf_counter()-start,f"{type(e).__name__}: {e}"
@@ -1,17 +1,351 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
 import mysql.connector
+from mysql.connector import pooling
+from mysql.connector.constants import FieldType
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+from ..Staging import STAGING_DIR, RowHashIndex, TableWriter, copy_table, read_matching, read_table, remove_table, table_parts, write_table
 
-def extract_erp(host: str,database: str,user: str,password: str) -> None:
+# rows fetched from the server per round trip when streaming a table
+CHUNK_SIZE = 50000
+
+# what each staging table needs downstream (transform_files + load_dw).
+# "columns" is the projection, "where" a row predicate pushed into the
+# query (the extracted table is aliased as t), "join" pulls columns from a
+# parent table in the same query. Tables not listed are extracted whole.
+EXTRACT_SPEC = {
+    "table_categories": {"columns": ["Category_ID", "Category_Name"]},
+    "table_subcategories": {
+        "columns": ["SubCat_ID", "SubCat_Name", "Category_ID"],
+        "join": {"table": "table_categories", "on": "Category_ID", "columns": ["Category_Name"]},
+    },
+    "table_cities": {"columns": ["City_ID", "City_Name", "Region"]},
+    "table_customers": {"columns": ["Customer_ID", "Full_Name", "City_ID"]},
+    "table_stores": {"columns": ["Store_ID", "Store_Name", "City_ID"]},
+    "table_products": {"columns": ["Product_ID", "Product_Name", "SubCat_ID", "Unit_Price", "Unit_Cost"]},
+    "table_reviews": {"columns": ["Product_ID", "Review_Text"]},
+    "table_sales": {"columns": ["Trans_ID", "Date", "Store_ID", "Customer_ID", "Product_ID", "Quantity", "Total_Revenue"]},
+}
+
+# tables extracted incrementally: "watermark" must only grow for new or
+# changed rows (a monotonic id or an update timestamp). With a "key", rows
+# past the watermark replace existing rows with the same key (upsert),
+# otherwise they are appended. Appended tables re-read the rows at the
+# watermark too, since rows sharing the last value can land after a run (an
+# update timestamp), and drop the ones they already hold by row hash.
+INCREMENTAL_TABLES = {
+    "table_sales": {"watermark": "Trans_ID"},
+}
+
+# the transforms rewrite staging/ in place, so the merged raw copy of each
+# incremental table lives here, one part per run, and is copied into
+# staging after every run
+CACHE_DIR = Path("cache")
+ERP_BASE_DIR = CACHE_DIR / "erp"
+WATERMARKS_PATH = CACHE_DIR / "erp_watermarks.json"
+
+_WATERMARKS_LOCK = threading.Lock()
+
+INT_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG, FieldType.INT24, FieldType.YEAR}
+FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL}
+DATETIME_TYPES = {FieldType.DATETIME, FieldType.TIMESTAMP}
+DATE_TYPES = {FieldType.DATE, FieldType.NEWDATE}
+STRING_TYPES = {FieldType.VARCHAR, FieldType.VAR_STRING, FieldType.STRING, FieldType.ENUM, FieldType.SET}
+
+def extract_erp(host: str,database: str,user: str,password: str,chunk_size: int | None = CHUNK_SIZE,workers: int = 1,incremental: bool = False) -> Dict[str, str]:
+    config={"host": host,"database": database,"user": user,"password": password}
+    failures={}
     try:
-        connection=mysql.connector.connect(host=host,database=database,user=user,password=password)
-        
-        dataframe=pd.read_sql("SHOW TABLES",connection)
-    
-        for column in dataframe.columns:
-            for table in dataframe[column]:
-                tmp=pd.read_sql(f"SELECT * FROM {table}",connection)
-                tmp.to_csv(f"staging/{table}.csv",index=False)
-        
-        connection.close()
+        connection=mysql.connector.connect(**config)
+        tables=list_tables(connection,database)
+
+        if workers<=1:
+            try:
+                for table in tables:
+                    try:
+                        extract_table(connection,table,chunk_size,incremental)
+                    except (mysql.connector.Error,OSError) as e:
+                        failures[table]=str(e)
+                        print(f"Error extracting {table}: {e}")
+            finally:
+                connection.close()
+        else:
+            connection.close()
+
+            # the pool size is the hard cap on concurrent queries against the replica
+            pool_size=min(workers,pooling.CNX_POOL_MAXSIZE)
+            pool=pooling.MySQLConnectionPool(pool_name="erp_extract",pool_size=pool_size,**config)
+
+            with ThreadPoolExecutor(max_workers=pool_size) as executor:
+                # tables are submitted largest first so the long dumps start right away
+                futures={executor.submit(pooled_extract,pool,table,chunk_size,incremental): table for table in tables}
+                for future in as_completed(futures):
+                    table=futures[future]
+                    try:
+                        future.result()
+                    except (mysql.connector.Error,OSError) as e:
+                        failures[table]=str(e)
+                        print(f"Error extracting {table}: {e}")
     except mysql.connector.Error as e:
-        print(f"Error extracting database: {e}")
\ No newline at end of file
+        print(f"Error extracting database: {e}")
+        failures["*"]=str(e)
+
+    if failures:
+        print(f"ERP extraction failed for {len(failures)} table(s): {', '.join(failures)}")
+    return failures
+
+def list_tables(connection, database: str) -> List[str]:
+    # information_schema row counts are estimates for InnoDB, good enough to order work
+    cursor=connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = %s ORDER BY COALESCE(TABLE_ROWS, 0) DESC",
+            (database,)
+        )
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def table_schema(connection, table: str) -> List[List[str]]:
+    cursor=connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COLUMN_NAME, COLUMN_TYPE FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s ORDER BY ORDINAL_POSITION",
+            (table,)
+        )
+        return [[str(name),str(column_type)] for name,column_type in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+def pooled_extract(pool, table: str, chunk_size: int | None, incremental: bool = False) -> None:
+    connection=pool.get_connection()
+    try:
+        extract_table(connection,table,chunk_size,incremental)
+    finally:
+        # returns the connection to the pool
+        connection.close()
+
+def extract_table(connection, table: str, chunk_size: int | None, incremental: bool = False) -> None:
+    if incremental and table in INCREMENTAL_TABLES:
+        extract_incremental(connection,table,chunk_size or CHUNK_SIZE)
+    elif chunk_size:
+        stream_table(connection,table,chunk_size,build_query(connection,table))
+    else:
+        tmp=pd.read_sql(build_query(connection,table),connection)
+        write_table(tmp,table)
+
+def build_query(connection, table: str, where: List[str] | None = None, keep: List[str] | None = None) -> str:
+    spec=EXTRACT_SPEC.get(table,{})
+    available=[name for name,_ in table_schema(connection,table)]
+
+    columns=list(spec.get("columns",[]))
+    for column in keep or []:
+        if columns and column not in columns:
+            columns.append(column)
+
+    missing=[column for column in columns if column not in available]
+    if missing:
+        # the spec is out of date with the source, extract everything rather than fail
+        print(f"{table}: columns {missing} not found, extracting all columns")
+        columns=[]
+
+    select=", ".join(f"t.`{column}`" for column in columns) if columns else "t.*"
+    joins=""
+
+    join=spec.get("join")
+    if join and columns:
+        parent=[name for name,_ in table_schema(connection,join["table"])]
+        if join["on"] in columns and all(column in parent for column in [join["on"],*join["columns"]]):
+            select+="".join(f", j.`{column}`" for column in join["columns"])
+            joins=f" LEFT JOIN `{join['table']}` AS j ON t.`{join['on']}` = j.`{join['on']}`"
+        else:
+            print(f"{table}: join with {join['table']} does not match the source, left to the transforms")
+
+    predicates=[spec["where"]] if spec.get("where") else []
+    predicates+=where or []
+
+    query=f"SELECT {select} FROM `{table}` AS t{joins}"
+    if predicates:
+        query+=" WHERE "+" AND ".join(f"({predicate})" for predicate in predicates)
+    return query
+
+def arrow_schema(description) -> pa.Schema | None:
+    # typed from the MySQL column types so every chunk gets the same schema,
+    # even when a chunk happens to be all NULL in some column
+    fields=[]
+    for name,type_code,*_ in description:
+        if type_code in INT_TYPES:
+            fields.append(pa.field(name,pa.int64()))
+        elif type_code in FLOAT_TYPES:
+            fields.append(pa.field(name,pa.float64()))
+        elif type_code in DATETIME_TYPES:
+            fields.append(pa.field(name,pa.timestamp("us")))
+        elif type_code in DATE_TYPES:
+            fields.append(pa.field(name,pa.date32()))
+        elif type_code in STRING_TYPES:
+            fields.append(pa.field(name,pa.string()))
+        else:
+            # anything else (blobs, TIME, BIT, ...) is inferred from the data
+            return None
+    return pa.schema(fields)
+
+def stream_table(connection, table: str, chunk_size: int, query: str, root: str | Path = STAGING_DIR, part: str | None = None, params: Tuple = (), track: str | None = None, dedup: RowHashIndex | None = None, admit: bool = True) -> Tuple[int, Any]:
+    # unbuffered cursor: rows stay on the server until fetched, so only
+    # one chunk is ever held in memory
+    cursor=connection.cursor(buffered=False)
+
+    start=time.perf_counter()
+    high=None
+    skipped=0
+    try:
+        cursor.execute(query,params)
+        columns=list(cursor.column_names)
+        decimals=[name for name,type_code,*_ in cursor.description if type_code in FLOAT_TYPES]
+
+        with TableWriter(table,root,part=part,schema=arrow_schema(cursor.description)) as writer:
+            while True:
+                chunk=cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                chunk=pd.DataFrame(chunk,columns=columns)
+                # DECIMAL comes back as decimal.Decimal objects
+                for column in decimals:
+                    chunk[column]=chunk[column].astype("float64")
+
+                if track and chunk[track].notna().any():
+                    chunk_high=chunk[track].max()
+                    high=chunk_high if high is None else max(high,chunk_high)
+
+                # rows already in the table are dropped (admit) or the chunk
+                # is only remembered (a full dump is kept as the source has it)
+                if dedup is not None and admit:
+                    fetched=len(chunk)
+                    chunk=dedup.admit(chunk,lambda rows: stored_rows(table,root,track,rows))
+                    skipped+=fetched-len(chunk)
+                elif dedup is not None:
+                    dedup.register(chunk)
+                writer.write(chunk)
+
+            # empty tables still produce a valid staging table
+            if writer.rows==0:
+                writer.write(pd.DataFrame(columns=columns))
+            rows=writer.rows
+    finally:
+        cursor.close()
+
+    elapsed=time.perf_counter()-start
+    rate=rows/elapsed if elapsed>0 else float(rows)
+    print(f"{table}: {rows} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)"+(f", {skipped} duplicate rows dropped" if skipped else ""))
+    return rows,high
+
+def stored_rows(table: str, root: str | Path, column: str, rows: pd.DataFrame) -> pd.DataFrame:
+    # the rows the table already holds with the same `column` values as rows,
+    # the only ones rows can be equal to
+    return read_matching(table,column,rows[column].dropna().unique().tolist(),root=root)
+
+def extract_incremental(connection, table: str, chunk_size: int) -> None:
+    spec=INCREMENTAL_TABLES[table]
+    column=spec["watermark"]
+    key=spec.get("key")
+
+    ERP_BASE_DIR.mkdir(parents=True,exist_ok=True)
+    schema=table_schema(connection,table)
+    # the watermark column has to be in the projection so it can be tracked
+    query=build_query(connection,table,keep=[column])
+
+    with _WATERMARKS_LOCK:
+        previous=load_watermarks().get(table)
+
+    parts=table_parts(table,ERP_BASE_DIR)
+    # appended tables remember the hash of every row they hold, so the rows
+    # read again at the watermark (or again after a run stopped before saving
+    # it) are not appended twice; upserted tables replace rows by key instead
+    dedup=RowHashIndex(ERP_BASE_DIR/f"{table}.hashes") if key is None else None
+
+    full=(
+        previous is None
+        or previous.get("watermark")!=column
+        or previous.get("schema")!=schema
+        or previous.get("query")!=query
+        or previous.get("value") is None
+        or not parts
+        # bases extracted before the index existed are rebuilt once
+        or (dedup is not None and not dedup.built)
+    )
+
+    if full:
+        print(f"{table}: full dump (no watermark yet, schema or spec changed)")
+        remove_table(table,ERP_BASE_DIR)
+        if dedup is not None:
+            dedup.reset()
+        _,high=stream_table(connection,table,chunk_size,query,root=ERP_BASE_DIR,part=part_name(0),track=column,dedup=dedup,admit=False)
+    else:
+        # the delta lands as one more part of the base table, O(delta) on disk
+        delta_part=part_name(next_part(parts))
+        rows,high=stream_table(
+            connection,table,chunk_size,
+            build_query(connection,table,where=[f"t.`{column}` {'>' if key else '>='} %s"],keep=[column]),
+            root=ERP_BASE_DIR,
+            part=delta_part,
+            params=(previous["value"],),
+            track=column,
+            dedup=dedup
+        )
+        if not rows:
+            for path in table_parts(table,ERP_BASE_DIR):
+                if path.stem==delta_part:
+                    path.unlink()
+        elif key is not None:
+            upsert_parts(table,key)
+        if high is None:
+            high=previous["value"]
+
+    if isinstance(high,np.generic):
+        high=high.item()
+
+    # the index only counts the rows once the part holding them is in place
+    if dedup is not None:
+        dedup.commit()
+
+    with _WATERMARKS_LOCK:
+        watermarks=load_watermarks()
+        watermarks[table]={"watermark": column,"value": high,"schema": schema,"query": query}
+        save_watermarks(watermarks)
+
+    copy_table(table,ERP_BASE_DIR)
+
+def part_name(number: int) -> str:
+    return f"part-{number:05d}"
+
+def next_part(parts: List[Path]) -> int:
+    return max((int(path.stem.split("-")[-1]) for path in parts),default=-1)+1
+
+def upsert_parts(table: str, key: str) -> None:
+    # rows from the newest part win over older rows with the same key
+    parts=table_parts(table,ERP_BASE_DIR)
+    merged=read_table(table,root=ERP_BASE_DIR).drop_duplicates(subset=[key],keep="last")
+    with TableWriter(table,ERP_BASE_DIR,part=part_name(next_part(parts))) as writer:
+        writer.write(merged)
+    for path in parts:
+        path.unlink()
+
+def load_watermarks() -> Dict[str, Dict]:
+    if not WATERMARKS_PATH.exists():
+        return {}
+    with open(WATERMARKS_PATH,"r",encoding="utf-8") as f:
+        return json.load(f)
+
+def save_watermarks(watermarks: Dict[str, Dict]) -> None:
+    tmp_path=f"{WATERMARKS_PATH}.part"
+    with open(tmp_path,"w",encoding="utf-8") as f:
+        json.dump(watermarks,f,indent=2,default=str)
+    os.replace(tmp_path,WATERMARKS_PATH)
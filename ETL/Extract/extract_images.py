@@ -1,31 +1,184 @@
-from typing import Dict
+from typing import Dict, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image,ImageEnhance
 import pytesseract
 import pandas as pd
+import hashlib
+import json
 import re
 import os
+import tempfile
 from pathlib import Path
-def extract_ocr() -> None:
+from ..Staging import infer_dtypes, write_table
+
+OCR_CONFIG = "--psm 6 -c preserve_interword_spaces=1"
+# images are converted to grayscale and rescaled to this resolution before OCR
+TARGET_DPI = 300
+# (ImageEnhance class, factor) applied in order after the grayscale conversion
+ENHANCEMENTS = [("Sharpness", 2)]
+# invoices sent to a single tesseract process as one multi-page TIFF
+BATCH_SIZE = 32
+
+# OCR results keyed by image bytes + OCR settings, evicted least recently used first
+OCR_CACHE_DIR = Path("cache") / "ocr"
+OCR_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+def extract_ocr(workers: int | None = None, batch_size: int = BATCH_SIZE) -> None:
     BASE_DIR = Path(__file__).resolve().parents[2]  # project root
     path = BASE_DIR / "data" / "legacy_invoices"
     orders_data=[]
     files=[file for file in os.listdir(path) if file.lower().startswith("order")]
     files.sort()
+
+    OCR_CACHE_DIR.mkdir(parents=True,exist_ok=True)
+    results={}
+    keys={}
+    misses=[]
     for file in files:
-        image=Image.open(f"{path}/{file}")
+        with open(path / file,"rb") as f:
+            key=ocr_cache_key(f.read())
+        keys[file]=key
+        cached=cache_get(key)
+        if cached is None:
+            misses.append(file)
+        else:
+            results[file]=cached
 
-        enhancer=ImageEnhance.Contrast(image)
-        image=enhancer.enhance(1)
-        enhancer=ImageEnhance.Sharpness(image)
-        image=enhancer.enhance(2)
+    paths=[str(path / file) for file in misses]
+    workers=workers or os.cpu_count() or 1
+    # keep every worker busy even when there are fewer misses than a full batch each
+    batch_size=max(1,min(batch_size,-(-len(paths)//workers)))
+    batches=[paths[i:i+batch_size] for i in range(0,len(paths),batch_size)]
+    if workers==1 or len(batches)<=1:
+        ocr_results=[result for batch in batches for result in ocr_batch(batch)]
+    else:
+        # map() yields in submission order, so rows keep the sorted file order
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            ocr_results=[result for batch in executor.map(ocr_batch,batches) for result in batch]
 
-        text=pytesseract.image_to_string(image,config="--psm 6 -c preserve_interword_spaces=1")
+    for file,(text,data,error) in zip(misses,ocr_results):
+        if text is not None:
+            cache_put(keys[file],text,data)
+        results[file]=(text,data,error)
 
-        data=parse_text(text.replace('$','S'))
+    for file in files:
+        text,data,error=results[file]
+        if error:
+            print(f"Error reading invoice {file}: {error}")
+            continue
         orders_data.append(data)
-    
+
+    evicted=evict_cache(OCR_CACHE_MAX_BYTES)
+    print(f"OCR cache: {len(files)-len(misses)} hits, {len(misses)} misses, {evicted} evicted")
+
     dataframe=pd.DataFrame(orders_data)
-    dataframe.to_csv(f"staging/invoices.csv",index=False)
+    write_table(infer_dtypes(dataframe),"invoices")
+
+def preprocess(image_path: str) -> Image.Image:
+    image=Image.open(image_path)
+    dpi=image.info.get("dpi")
+
+    # one channel instead of three for everything that follows
+    image=image.convert("L")
+
+    if dpi and dpi[0] and round(float(dpi[0]))!=TARGET_DPI:
+        scale=TARGET_DPI/float(dpi[0])
+        image=image.resize((round(image.width*scale),round(image.height*scale)),Image.Resampling.LANCZOS)
+
+    for name,factor in ENHANCEMENTS:
+        enhancer=getattr(ImageEnhance,name)(image)
+        image=enhancer.enhance(factor)
+    return image
+
+def ocr_batch(image_paths: List[str]) -> List[Tuple[str | None, Dict | None, str | None]]:
+    # runs in a worker process: errors are returned, not raised, so one bad
+    # image does not take the whole batch down
+    results: List[Tuple[str | None, Dict | None, str | None]]=[(None,None,None)]*len(image_paths)
+    images=[]
+    positions=[]
+    for position,image_path in enumerate(image_paths):
+        try:
+            images.append(preprocess(image_path))
+            positions.append(position)
+        except Exception as e:
+            results[position]=(None,None,f"{type(e).__name__}: {e}")
+
+    pages=None
+    if len(images)>1:
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                tiff_path=os.path.join(tmp_dir,"batch.tif")
+                images[0].save(tiff_path,save_all=True,append_images=images[1:])
+                text=pytesseract.image_to_string(tiff_path,config=f"{OCR_CONFIG} --dpi {TARGET_DPI}")
+            # tesseract separates pages with a form feed
+            pages=text.split("\f")
+            if len(pages)==len(images)+1 and not pages[-1].strip():
+                pages.pop()
+            if len(pages)!=len(images):
+                pages=None
+        except Exception:
+            pages=None
+
+    for index,(position,image) in enumerate(zip(positions,images)):
+        text=None
+        try:
+            if pages is not None:
+                text=pages[index]
+            else:
+                # single image, or the batch could not be split back per invoice
+                text=pytesseract.image_to_string(image,config=f"{OCR_CONFIG} --dpi {TARGET_DPI}")
+            results[position]=(text,parse_text(text.replace('$','S')),None)
+        except Exception as e:
+            results[position]=(text,None,f"{type(e).__name__}: {e}")
+    return results
+
+def ocr_cache_key(image_bytes: bytes) -> str:
+    digest=hashlib.sha256(image_bytes)
+    digest.update(OCR_CONFIG.encode())
+    digest.update(json.dumps([TARGET_DPI,ENHANCEMENTS]).encode())
+    return digest.hexdigest()
+
+def cache_get(key: str) -> Tuple[str, Dict | None, str | None] | None:
+    cache_path=OCR_CACHE_DIR / f"{key}.json"
+    try:
+        with open(cache_path,"r",encoding="utf-8") as f:
+            entry=json.load(f)
+    except (OSError,ValueError):
+        return None
+
+    # touch on hit so eviction drops the least recently used entries
+    os.utime(cache_path)
+
+    if entry["data"] is not None:
+        return entry["text"],entry["data"],None
+    # OCR worked but parsing did not: no need to run tesseract again
+    try:
+        return entry["text"],parse_text(entry["text"].replace('$','S')),None
+    except Exception as e:
+        return entry["text"],None,f"{type(e).__name__}: {e}"
+
+def cache_put(key: str, text: str, data: Dict | None) -> None:
+    cache_path=OCR_CACHE_DIR / f"{key}.json"
+    tmp_path=f"{cache_path}.part"
+    with open(tmp_path,"w",encoding="utf-8") as f:
+        json.dump({"text": text,"data": data},f)
+    os.replace(tmp_path,cache_path)
+
+def evict_cache(max_bytes: int) -> int:
+    entries: List[Tuple[float, int, Path]]=[]
+    for entry in OCR_CACHE_DIR.glob("*.json"):
+        stat=entry.stat()
+        entries.append((stat.st_mtime,stat.st_size,entry))
+
+    total=sum(size for _,size,_ in entries)
+    evicted=0
+    for _,size,entry in sorted(entries):
+        if total<=max_bytes:
+            break
+        entry.unlink()
+        total-=size
+        evicted+=1
+    return evicted
 
 def parse_text(text: str) -> Dict:
     data={}
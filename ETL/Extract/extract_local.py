@@ -1,19 +1,33 @@
+import hashlib
+import json
+import os
+import re
 import pandas as pd
 from pathlib import Path
+from typing import Dict, List
+from ..Staging import copy_table, remove_table, table_exists, write_table
 
-def extract_locale() -> None:
-    input_folder = Path("./data")
+DEFAULT_FILES = [
+    "marketing_expenses.xlsx",
+    "monthly_targets.xlsx",
+    "shipping_rates.xlsx"
+]
+
+# the transforms rewrite staging/ in place, so the converted sheets are kept
+# here and copied into staging when the workbook has not changed
+XLSX_CACHE_DIR = Path("cache") / "xlsx"
+MANIFEST_PATH = Path("cache") / "xlsx_manifest.json"
+
+def extract_locale(input_folder: str | Path = "./data", files: List[str] | None = None) -> None:
+    input_folder = Path(input_folder)
     output_folder = Path("./staging")
 
     output_folder.mkdir(parents=True, exist_ok=True)
+    XLSX_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
-    files = [
-        "marketing_expenses.xlsx",
-        "monthly_targets.xlsx",
-        "shipping_rates.xlsx"
-    ]
+    manifest = load_manifest()
 
-    for file_name in files:
+    for file_name in files or DEFAULT_FILES:
         file_path = input_folder / file_name
 
         if not file_path.exists():
@@ -21,11 +35,79 @@ def extract_locale() -> None:
             continue
 
         try:
-            df = pd.read_excel(file_path)
-            out_name = file_name.replace(".xlsx", ".csv")
-            out_path = output_folder / out_name
+            entry = manifest.get(file_name)
+            stat = file_path.stat()
+
+            unchanged = False
+            if entry and all(table_exists(out_name, XLSX_CACHE_DIR) for out_name in entry["outputs"]):
+                if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                    unchanged = True
+                elif entry["size"] == stat.st_size and entry["sha256"] == file_hash(file_path):
+                    # touched but identical content
+                    unchanged = True
 
-            df.to_csv(out_path, index=False)
+            if unchanged:
+                outputs = entry["outputs"]
+                print(f"{file_name}: unchanged, reusing converted sheets")
+            else:
+                outputs = convert_workbook(file_path)
+                # sheets deleted from the workbook since the last conversion
+                for out_name in (entry or {}).get("outputs", []):
+                    if out_name not in outputs:
+                        print(f"{file_name}: sheet for {out_name} is gone, removing it")
+                        remove_table(out_name, XLSX_CACHE_DIR)
+                        remove_table(out_name, output_folder)
+                entry = {"sha256": file_hash(file_path), "outputs": outputs}
+
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+            manifest[file_name] = entry
+
+            for out_name in outputs:
+                copy_table(out_name, XLSX_CACHE_DIR, output_folder)
 
         except Exception as e:
             print(f"❌ Error extracting {file_name}: {e}")
+
+    save_manifest(manifest)
+
+def convert_workbook(file_path: Path) -> List[str]:
+    # the openpyxl engine opens the workbook read-only; every sheet is read
+    # in one pass over the file
+    sheets = pd.read_excel(file_path, sheet_name=None, engine="openpyxl")
+    outputs = sheet_outputs(file_path.stem, list(sheets))
+    for out_name, df in zip(outputs, sheets.values()):
+        write_table(df, out_name, XLSX_CACHE_DIR)
+    return outputs
+
+def sheet_outputs(stem: str, titles: List[str]) -> List[str]:
+    # first sheet keeps the historical name, the others get a suffix from
+    # their title. Titles giving the same suffix ("Q1-Sales", "Q1 Sales")
+    # get the sheet position appended so no sheet overwrites another
+    outputs = []
+    for index, title in enumerate(titles):
+        slug = re.sub(r"\W+", "_", str(title)).strip("_").lower()
+        out_name = stem if index == 0 else f"{stem}_{slug or index}"
+        while out_name in outputs:
+            out_name = f"{out_name}_{index}"
+        outputs.append(out_name)
+    return outputs
+
+def file_hash(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest() -> Dict[str, Dict]:
+    if not MANIFEST_PATH.exists():
+        return {}
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest: Dict[str, Dict]) -> None:
+    tmp_path = f"{MANIFEST_PATH}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
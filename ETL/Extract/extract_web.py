@@ -1,39 +1,322 @@
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+import httpx
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import pandas as pd
+from ..Staging import infer_dtypes, write_table
 
-def extract_scraper(base_url: str) -> None:
-    all_products=[]
-    all_prices=[]
+# lxml is several times faster than the pure-Python parser when it is installed
+PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+# only the tags the scraper reads are turned into a tree
+PAGE_TAGS = SoupStrainer(["h5","span","a"])
 
-    current_url=base_url
+MAX_IN_FLIGHT = 8
+REQUESTS_PER_SECOND = 10  # per host
+RETRIES = 3
+BACKOFF = 0.5  # seconds, doubled on every retry
+TIMEOUT = 30
+
+# per-URL body + validators, and the list of pages finished by an unfinished crawl
+HTTP_CACHE_DIR = Path("cache") / "http"
+PROGRESS_PATH = Path("cache") / "scrape_progress.txt"
+
+Page = Tuple[List[str], List[str], str | None]
+
+class PageCache:
+    def __init__(self, base_url: str) -> None:
+        HTTP_CACHE_DIR.mkdir(parents=True,exist_ok=True)
+        self.base_url=base_url
+        self.done=set()
+        self.revalidated=0
+        self.downloaded=0
+        self.resumed=0
+
+        # first line is the crawl's base URL, then one finished page per line
+        if PROGRESS_PATH.exists():
+            lines=PROGRESS_PATH.read_text(encoding="utf-8").splitlines()
+            if lines and lines[0]==base_url:
+                self.done=set(lines[1:])
+                print(f"Resuming crawl of {base_url}: {len(self.done)} pages already done")
+        if not self.done:
+            PROGRESS_PATH.write_text(base_url+"\n",encoding="utf-8")
 
-    while current_url:
+    def paths(self, url: str) -> Tuple[Path, Path]:
+        key=hashlib.sha256(url.encode()).hexdigest()
+        return HTTP_CACHE_DIR / f"{key}.json",HTTP_CACHE_DIR / f"{key}.html"
 
+    def entry(self, url: str) -> Dict | None:
+        meta_path,_=self.paths(url)
         try:
-            res=requests.get(current_url)
-            soup=BeautifulSoup(res.content,"html.parser")
+            with open(meta_path,"r",encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError,ValueError):
+            return None
 
+    def resume(self, url: str) -> Page | None:
+        # pages finished before the interruption are not requested again
+        if url not in self.done:
+            return None
+        entry=self.entry(url)
+        if entry is None:
+            return None
+        self.resumed+=1
+        return entry["products"],entry["prices"],entry["next_href"]
 
-            for tag in soup.find_all(["h5"],class_=["product-name"]):
-                all_products.append(tag.text)
-            for tag in soup.find_all(["span"],class_=["product-price"]):
-                all_prices.append(str(tag.text).replace("DZD",""))
+    def headers(self, url: str) -> Dict[str, str]:
+        entry=self.entry(url)
+        headers={}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"]=entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"]=entry["last_modified"]
+        return headers
 
-            next_link=soup.find(["a"],id="next-page-btn")
-            
-            if next_link and next_link.get("href"):
-                current_url="".join([base_url,"/",next_link.get("href")])
-            else:
-                current_url=None
+    def not_modified(self, url: str) -> Page:
+        entry=self.entry(url)
+        self.revalidated+=1
+        self.mark_done(url)
+        return entry["products"],entry["prices"],entry["next_href"]
 
-        except requests.RequestException as e:
-            print(f"Error scraping {current_url}: {e}")
-            break
+    def store(self, url: str, headers, content: bytes, page: Page) -> None:
+        meta_path,body_path=self.paths(url)
+        with open(f"{body_path}.part","wb") as f:
+            f.write(content)
+        os.replace(f"{body_path}.part",body_path)
+
+        entry={
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "products": page[0],
+            "prices": page[1],
+            "next_href": page[2],
+        }
+        with open(f"{meta_path}.part","w",encoding="utf-8") as f:
+            json.dump(entry,f)
+        os.replace(f"{meta_path}.part",meta_path)
+
+        self.downloaded+=1
+        self.mark_done(url)
+
+    def mark_done(self, url: str) -> None:
+        if url not in self.done:
+            self.done.add(url)
+            with open(PROGRESS_PATH,"a",encoding="utf-8") as f:
+                f.write(url+"\n")
+
+    def finish(self, complete: bool) -> None:
+        if complete:
+            PROGRESS_PATH.unlink(missing_ok=True)
+        print(f"Scraper cache: {self.downloaded} downloaded, {self.revalidated} not modified, {self.resumed} resumed")
+
+def extract_scraper(base_url: str, asynchronous: bool = False, max_in_flight: int = MAX_IN_FLIGHT, pages: int | None = None) -> None:
+    cache=PageCache(base_url)
+    if asynchronous:
+        all_products,all_prices,complete=asyncio.run(scrape_async(base_url,cache,max_in_flight,pages))
+    else:
+        all_products,all_prices,complete=scrape(base_url,cache)
+    cache.finish(complete)
 
     dataframe=pd.DataFrame({
         "Product_Name": all_products,
         "Unit_Price": all_prices
     })
-    
-    dataframe.to_csv("staging/competitor.csv",index=False)
\ No newline at end of file
+
+    write_table(infer_dtypes(dataframe),"competitor")
+
+def parse_page(content: bytes) -> Page:
+    soup=BeautifulSoup(content,PARSER,parse_only=PAGE_TAGS)
+
+    products=[tag.text for tag in soup.find_all(["h5"],class_=["product-name"])]
+    prices=[str(tag.text).replace("DZD","") for tag in soup.find_all(["span"],class_=["product-price"])]
+
+    next_link=soup.find(["a"],id="next-page-btn")
+    next_href=next_link.get("href") if next_link and next_link.get("href") else None
+    return products,prices,next_href
+
+def scrape(base_url: str, cache: PageCache) -> Tuple[List[str], List[str], bool]:
+    all_products=[]
+    all_prices=[]
+
+    current_url=base_url
+
+    with requests.Session() as session:
+        while current_url:
+
+            try:
+                page=cache.resume(current_url)
+                if page is None:
+                    res=session.get(current_url,headers=cache.headers(current_url),timeout=TIMEOUT)
+                    if res.status_code==304:
+                        page=cache.not_modified(current_url)
+                    else:
+                        page=parse_page(res.content)
+                        if res.ok:
+                            cache.store(current_url,res.headers,res.content,page)
+                products,prices,next_href=page
+
+                all_products.extend(products)
+                all_prices.extend(prices)
+
+                if next_href:
+                    current_url="".join([base_url,"/",next_href])
+                else:
+                    current_url=None
+
+            except requests.RequestException as e:
+                print(f"Error scraping {current_url}: {e}")
+                return all_products,all_prices,False
+
+    return all_products,all_prices,True
+
+class HostRateLimiter:
+    def __init__(self, per_second: float) -> None:
+        self.interval=1/per_second if per_second else 0
+        self.next_slot: Dict[str, float]={}
+        self.lock=asyncio.Lock()
+
+    async def wait(self, url: str) -> None:
+        host=urlsplit(url).netloc
+        async with self.lock:
+            now=time.monotonic()
+            slot=max(now,self.next_slot.get(host,now))
+            self.next_slot[host]=slot+self.interval
+        if slot>now:
+            await asyncio.sleep(slot-now)
+
+async def fetch(client: httpx.AsyncClient, url: str, cache: PageCache, semaphore: asyncio.Semaphore, limiter: HostRateLimiter) -> Page | None:
+    # None means the page does not exist (past the last page)
+    page=cache.resume(url)
+    if page is not None:
+        return page
+    for attempt in range(RETRIES+1):
+        try:
+            async with semaphore:
+                await limiter.wait(url)
+                res=await client.get(url,headers=cache.headers(url))
+            if res.status_code==404:
+                return None
+            if res.status_code==304:
+                return cache.not_modified(url)
+            if res.status_code==429 or res.status_code>=500:
+                raise httpx.HTTPStatusError(f"{res.status_code} for {url}",request=res.request,response=res)
+            res.raise_for_status()
+            page=parse_page(res.content)
+            cache.store(url,res.headers,res.content,page)
+            return page
+        except (httpx.TransportError,httpx.HTTPStatusError) as e:
+            retryable=not isinstance(e,httpx.HTTPStatusError) or e.response.status_code==429 or e.response.status_code>=500
+            if attempt==RETRIES or not retryable:
+                raise
+            await asyncio.sleep(BACKOFF*2**attempt)
+    return None
+
+def page_template(href: str) -> Tuple[str, int] | None:
+    # "page2.html" -> ("page{}.html", 2): the last number in the link is the page number
+    matches=list(re.finditer(r"\d+",href))
+    if not matches:
+        return None
+    last=matches[-1]
+    return href[:last.start()]+"{}"+href[last.end():],int(last.group())
+
+async def scrape_async(base_url: str, cache: PageCache, max_in_flight: int = MAX_IN_FLIGHT, pages: int | None = None) -> Tuple[List[str], List[str], bool]:
+    semaphore=asyncio.Semaphore(max_in_flight)
+    limiter=HostRateLimiter(REQUESTS_PER_SECOND)
+    limits=httpx.Limits(max_connections=max_in_flight,max_keepalive_connections=max_in_flight)
+
+    results: Dict[int, Tuple[List[str], List[str]]]={}
+    complete=True
+
+    async with httpx.AsyncClient(limits=limits,timeout=TIMEOUT,follow_redirects=True) as client:
+        try:
+            page=await fetch(client,base_url,cache,semaphore,limiter)
+            if page is None:
+                return [],[],True
+            products,prices,next_href=page
+            results[1]=(products,prices)
+
+            template=page_template(next_href) if next_href else None
+            if next_href and template:
+                await scrape_pages(client,base_url,template,cache,semaphore,limiter,results,max_in_flight,pages)
+            elif next_href:
+                await follow_links(client,base_url,next_href,cache,semaphore,limiter,results)
+        except (httpx.HTTPError,httpx.InvalidURL) as e:
+            print(f"Error scraping {base_url}: {e}")
+            complete=False
+
+    all_products=[]
+    all_prices=[]
+    # stop at the first gap so the output matches what following the links would give
+    page=1
+    while page in results:
+        all_products.extend(results[page][0])
+        all_prices.extend(results[page][1])
+        page+=1
+    return all_products,all_prices,complete
+
+async def follow_links(client: httpx.AsyncClient, base_url: str, next_href: str, cache: PageCache, semaphore: asyncio.Semaphore, limiter: HostRateLimiter, results: Dict[int, Tuple[List[str], List[str]]], start_page: int = 2) -> None:
+    # no usable URL pattern: walk the next links one page at a time, next_href
+    # being the link to page start_page
+    page=start_page-1
+    while next_href:
+        url="".join([base_url,"/",next_href])
+        parsed=await fetch(client,url,cache,semaphore,limiter)
+        if parsed is None:
+            return
+        products,prices,next_href=parsed
+        page+=1
+        results[page]=(products,prices)
+
+async def scrape_pages(client: httpx.AsyncClient, base_url: str, template: Tuple[str, int], cache: PageCache, semaphore: asyncio.Semaphore, limiter: HostRateLimiter, results: Dict[int, Tuple[List[str], List[str]]], max_in_flight: int, pages: int | None) -> None:
+    pattern,first=template
+    # the next link of page 1 points at page number `first`
+    offset=first-2
+
+    def url_for(page: int) -> str:
+        return "".join([base_url,"/",pattern.format(page+offset)])
+
+    async def get(page: int) -> Tuple[int, Page | None]:
+        return page,await fetch(client,url_for(page),cache,semaphore,limiter)
+
+    # page 2 confirms the pattern: its next link must be the pattern for page 3
+    _,second=await get(2)
+    if second is None:
+        return
+    results[2]=second[:2]
+    if second[2] is None:
+        return
+    if second[2]!=pattern.format(3+offset):
+        await follow_links(client,base_url,second[2],cache,semaphore,limiter,results,start_page=3)
+        return
+
+    page=3
+    last=pages
+    while last is None or page<=last:
+        # with a known page count everything is fetched at once, otherwise in
+        # windows of max_in_flight pages until the last page shows up
+        stop=last+1 if last is not None else page+max_in_flight
+        fetched=await asyncio.gather(*(get(number) for number in range(page,stop)))
+        for number,parsed in sorted(fetched):
+            if parsed is None:
+                last=number-1 if last is None else min(last,number-1)
+                break
+            results[number]=parsed[:2]
+            if parsed[2] is None:
+                last=number if last is None else min(last,number)
+                break
+        if last is not None and last<stop:
+            break
+        page=stop
+
+    # drop pages fetched speculatively past the end
+    for number in [number for number in results if last is not None and number>last]:
+        del results[number]
@@ -3,14 +3,14 @@ import sqlite3
 import pandas as pd
 from pathlib import Path
 from .create_dw import create_dw_schema
+from ..Staging import iter_table, read_table, sales_chunk_size
 
 DB_PATH = Path("techstore_dw.db")
 
-STAGING = Path("staging")
-PRODUCTS_CSV   = STAGING / "table_products.csv"
-STORES_CSV     = STAGING / "table_stores.csv"
-CUSTOMERS_CSV  = STAGING / "table_customers.csv"
-SALES_CSV      = STAGING / "table_sales.csv"
+PRODUCTS_TABLE   = "table_products"
+STORES_TABLE     = "table_stores"
+CUSTOMERS_TABLE  = "table_customers"
+SALES_TABLE      = "table_sales"
 
 
 def load_dw_data() -> None:
@@ -22,15 +22,21 @@ def load_dw_data() -> None:
     cur = conn.cursor()
     cur.execute("PRAGMA foreign_keys = ON;")
 
-    # 2) read staging
-    products  = pd.read_csv(PRODUCTS_CSV)
-    stores    = pd.read_csv(STORES_CSV)
-    customers = pd.read_csv(CUSTOMERS_CSV)
-    sales     = pd.read_csv(SALES_CSV)
+    # 2) read staging (sales chunk by chunk in out-of-core mode)
+    chunk_size = sales_chunk_size()
+    products  = read_table(PRODUCTS_TABLE)
+    stores    = read_table(STORES_TABLE)
+    customers = read_table(CUSTOMERS_TABLE)
+    sales     = None if chunk_size else read_table(SALES_TABLE)
 
     # 3) build Dim_Date from sales Date
-    sales["Date"] = pd.to_datetime(sales["Date"], errors="coerce", format="mixed")
-    dates = pd.Series(sales["Date"].dropna().dt.normalize().unique(), name="Date")
+    if chunk_size:
+        dates = pd.Series(dtype="datetime64[ns]", name="Date")
+        for chunk in iter_table(SALES_TABLE, chunk_size, columns=["Date"]):
+            dates = pd.Series(pd.unique(pd.concat([dates, sale_days(chunk["Date"])])), name="Date")
+    else:
+        sales["Date"] = pd.to_datetime(sales["Date"], errors="coerce", format="mixed")
+        dates = pd.Series(sale_days(sales["Date"]), name="Date")
     dim_date = pd.DataFrame({"Date": dates})
     dim_date["DateKey"] = dim_date["Date"].dt.strftime("%Y%m%d").astype(int)
     dim_date["Day"] = dim_date["Date"].dt.day
@@ -39,8 +45,6 @@ def load_dw_data() -> None:
     dim_date["DayName"] = dim_date["Date"].dt.strftime("%A")
     dim_date = dim_date.drop(columns=["Date"])
 
-    sales["DateKey"] = sales["Date"].dt.strftime("%Y%m%d").astype("Int64")
-
     # 4) clear old rows
     cur.executescript("""
         DELETE FROM Fact_Sales;
@@ -71,17 +75,28 @@ def load_dw_data() -> None:
 
     dim_date.to_sql("Dim_Date", conn, if_exists="append", index=False)
 
-    # 6) load fact
+    # 6) load fact (each chunk is committed as it is written)
+    for chunk in iter_table(SALES_TABLE, chunk_size) if chunk_size else [sales]:
+        fact_rows(chunk).to_sql("Fact_Sales", conn, if_exists="append", index=False)
+
+    conn.commit()
+    conn.close()
+
+
+def sale_days(dates: pd.Series) -> pd.Series:
+    return pd.Series(pd.to_datetime(dates, errors="coerce", format="mixed").dropna().dt.normalize().unique())
+
+
+def fact_rows(sales: pd.DataFrame) -> pd.DataFrame:
+    sales["Date"] = pd.to_datetime(sales["Date"], errors="coerce", format="mixed")
+    sales["DateKey"] = sales["Date"].dt.strftime("%Y%m%d").astype("Int64")
+
     fact_cols = ["Trans_ID","DateKey","Store_ID","Product_ID","Customer_ID",
                  "Quantity","Total_Revenue","Net_Profit", "Marketing_Cost"]
     fact = sales[[c for c in fact_cols if c in sales.columns]].copy()
     fact = fact.dropna(subset=["Trans_ID","DateKey","Store_ID","Product_ID","Customer_ID"])
     fact["DateKey"] = fact["DateKey"].astype(int)
-
-    fact.to_sql("Fact_Sales", conn, if_exists="append", index=False)
-
-    conn.commit()
-    conn.close()
+    return fact
 
 
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+from .staging_store import (
+    STAGING_DIR,
+    StagingCatalog,
+    StoredTable,
+    TableWriter,
+    copy_table,
+    export_csv,
+    fingerprint,
+    infer_dtypes,
+    iter_table,
+    list_tables,
+    read_matching,
+    read_table,
+    remove_table,
+    sales_chunk_size,
+    stage_table,
+    staging_catalog,
+    staging_format,
+    stored_blocks,
+    table_blocks,
+    table_exists,
+    table_parts,
+    write_table
+)
+from .dedup import RowHashIndex, row_hashes
+from .dtype_policy import DTYPE_POLICIES, compact_frame, memory_budget
@@ -0,0 +1,132 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List
+import numpy as np
+import pandas as pd
+
+# segments merged into one once there are more than this many
+MAX_SEGMENTS = 16
+# written on the first commit, so an index of an empty table counts as built
+BUILT_MARKER = "built"
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    # 64-bit hash of every row's values; rows equal value for value (with the
+    # same dtypes) hash the same
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def equal_rows(rows: pd.DataFrame, others: pd.DataFrame) -> np.ndarray:
+    # which of rows have a row equal value for value in others
+    if rows.empty or others.empty:
+        return np.zeros(len(rows), dtype=bool)
+    columns = list(rows.columns)
+    matched = rows.merge(others[columns].drop_duplicates(), on=columns, how="left", indicator=True)
+    return (matched["_merge"] == "both").to_numpy()
+
+class RowHashIndex:
+    # hashes of every row a table already holds, kept on disk as sorted
+    # segments of uint64 (one per committed batch) that are memory-mapped, so
+    # checking a batch costs O(batch * log rows) and never loads the history.
+    # Hashes only point at candidates: a row is a duplicate once it is found
+    # equal to a stored row
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.segments: List[np.ndarray] = [
+            np.load(path, mmap_mode="r") for path in sorted(self.directory.glob("segment-*.npy"))
+        ]
+        # hashes since the last commit, as sorted runs (see add_pending)
+        self.pending: List[np.ndarray] = []
+        # rows admitted since the last commit, not stored yet
+        self.admitted: List[pd.DataFrame] = []
+        self.rows = sum(len(segment) for segment in self.segments)
+        # (indexes from before the marker count as built when they hold rows)
+        self.built = (self.directory / BUILT_MARKER).exists() or self.rows > 0
+
+    def contains(self, hashes: np.ndarray, pending: bool = True) -> np.ndarray:
+        # the batch is searched in sorted order, so each segment is walked
+        # front to back instead of at random
+        order = np.argsort(hashes)
+        ordered = hashes[order]
+        found = np.zeros(len(hashes), dtype=bool)
+        for segment in self.segments + (self.pending if pending else []):
+            if len(segment) == 0:
+                continue
+            positions = np.searchsorted(segment, ordered)
+            inside = positions < len(segment)
+            found[inside] |= segment[positions[inside]] == ordered[inside]
+        found[order] = found.copy()
+        return found
+
+    def admit(self, df: pd.DataFrame, stored: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        # the rows of df not seen before (first copy of repeats inside df),
+        # which are remembered from now on. A row whose hash is known is only
+        # dropped once it is found equal to a row stored(candidates) returns
+        # (the stored rows that may equal them) or to one admitted since the
+        # last commit, so a hash collision never drops a real row
+        hashes = row_hashes(df)
+        known = self.contains(hashes)
+        if known.any():
+            candidates = df[known]
+            seen = np.zeros(len(candidates), dtype=bool)
+            if self.contains(hashes[known], pending=False).any():
+                seen |= equal_rows(candidates, stored(candidates))
+            for rows in self.admitted:
+                seen |= equal_rows(candidates, rows)
+            known[known] = seen
+        new = ~known & ~df.duplicated().to_numpy()
+        self.add_pending(hashes[new])
+        if new.any():
+            self.admitted.append(df[new])
+        return df[new]
+
+    def register(self, df: pd.DataFrame) -> None:
+        self.add_pending(row_hashes(df))
+
+    def add_pending(self, hashes: np.ndarray) -> None:
+        # a batch is sorted once and merged into the run before it while that
+        # run is no longer, like a binary counter: a long extract holds
+        # O(log batches) runs and each hash is merged O(log batches) times
+        if len(hashes) == 0:
+            return
+        run = np.sort(hashes)
+        while self.pending and len(self.pending[-1]) <= len(run):
+            # (the stable sort is a merge of the two sorted runs)
+            run = np.sort(np.concatenate([self.pending.pop(), run]), kind="stable")
+        self.pending.append(run)
+
+    def commit(self) -> None:
+        batch = np.unique(np.concatenate(self.pending)) if self.pending else np.empty(0, dtype=np.uint64)
+        self.pending = []
+        self.admitted = []
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / BUILT_MARKER).touch()
+        self.built = True
+        if len(batch) == 0:
+            return
+        number = len(list(self.directory.glob("segment-*.npy")))
+        self.save(batch, self.directory / f"segment-{number:05d}.npy")
+        self.segments.append(np.load(self.directory / f"segment-{number:05d}.npy", mmap_mode="r"))
+        self.rows += len(batch)
+
+        if len(self.segments) > MAX_SEGMENTS:
+            # losing the index half-way only lets duplicates through, so the
+            # merged segment replaces the old ones without more ceremony
+            merged = np.unique(np.concatenate(self.segments))
+            self.save(merged, self.directory / "merged.npy")
+            for path in self.directory.glob("segment-*.npy"):
+                path.unlink()
+            os.replace(self.directory / "merged.npy", self.directory / "segment-00000.npy")
+            self.segments = [np.load(self.directory / "segment-00000.npy", mmap_mode="r")]
+
+    def save(self, hashes: np.ndarray, path: Path) -> None:
+        with open(f"{path}.part", "wb") as f:
+            np.save(f, hashes)
+        os.replace(f"{path}.part", path)
+
+    def reset(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.segments = []
+        self.pending = []
+        self.admitted = []
+        self.rows = 0
+        self.built = False
@@ -0,0 +1,67 @@
+import os
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+# Memory-budget mode (MEMORY_BUDGET=true): staging tables are compacted when
+# they are read from disk, Parquet ones a column at a time as they are read
+# (staging_store.read_compact). Columns without an explicit policy get one
+# from their contents:
+#   id       numeric *_ID columns -> nullable Int32/Int64
+#   category text columns with few distinct values (Region, Category_Name...)
+#   int      integers downcast, to int32 at the smallest so arithmetic on
+#            them keeps headroom
+#   float32  only floats that survive the round-trip to float32 unchanged
+#   keep     left as read
+CATEGORY_MAX_RATIO = 0.5  # distinct values / rows
+DTYPE_POLICIES: Dict[str, Dict[str, str]] = {
+    "table_reviews": {"Review_Text": "keep"},
+    "invoices": {"Order_ID": "keep"},
+}
+
+def memory_budget() -> bool:
+    return os.environ.get("MEMORY_BUDGET", "").lower() in ("1", "true", "yes")
+
+def column_policy(column: pd.Series) -> str:
+    if str(column.name).endswith("_ID") and pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype):
+        return "id"
+    if column.dtype == object:
+        return "category" if column.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(column) else "keep"
+    if pd.api.types.is_integer_dtype(column.dtype) and isinstance(column.dtype, np.dtype):
+        return "int"
+    if column.dtype == np.float64:
+        return "float32"
+    return "keep"
+
+def compact_column(column: pd.Series, policy: str) -> pd.Series:
+    if policy == "id":
+        values = column.dropna()
+        # float ids with fractions are not ids, leave them alone
+        if not (values == np.floor(values)).all():
+            return column
+        fits_int32 = values.empty or (values.min() >= np.iinfo(np.int32).min and values.max() <= np.iinfo(np.int32).max)
+        return column.astype("Int32" if fits_int32 else "Int64")
+    if policy == "category":
+        values = column.dropna()
+        # mixed Python types would come back as text, keep those as they are
+        if not all(isinstance(value, str) for value in values.unique()):
+            return column
+        return column.astype("category")
+    if policy == "int":
+        if column.empty or (column.min() >= np.iinfo(np.int32).min and column.max() <= np.iinfo(np.int32).max):
+            return column.astype(np.int32)
+        return column
+    if policy == "float32":
+        narrow = column.astype(np.float32)
+        same = (narrow.astype(np.float64) == column) | column.isna()
+        return narrow if same.all() else column
+    return column
+
+def compact_frame(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    policies = DTYPE_POLICIES.get(name, {})
+    before = df.memory_usage(deep=True).sum()
+    for column in df.columns:
+        df[column] = compact_column(df[column], policies.get(column) or column_policy(df[column]))
+    after = df.memory_usage(deep=True).sum()
+    print(f"Memory budget {name}: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB")
+    return df
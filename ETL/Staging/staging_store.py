@@ -0,0 +1,532 @@
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+
+from .dtype_policy import CATEGORY_MAX_RATIO, DTYPE_POLICIES, column_policy, compact_column, compact_frame, memory_budget
+
+STAGING_DIR = Path("staging")
+FORMATS = ("parquet", "csv")
+PARQUET_COMPRESSION = "zstd"
+# rows read at a time when a CSV table is searched
+LOOKUP_CHUNK_ROWS = 100_000
+# rows converted from Arrow to pandas at a time by a memory-budget read
+READ_BATCH_ROWS = 65_536
+# Parquet metadata key of the blocks a file's leading rows were kept from
+BLOCKS_METADATA_KEY = b"staging_blocks"
+
+# A staging table is either one file, staging/<name>.<format>, or a directory
+# staging/<name>/ of part files that are read back concatenated in file-name
+# order. STAGING_FORMAT picks the format new files are written in; reads fall
+# back to whichever format exists.
+#
+# The blocks of a table, (identity, rows) in order, tell where its leading
+# rows came from: each extracted file is one, and a step that rewrites a
+# table but keeps those rows in place (and in order) writes it with the
+# blocks it read, so later steps can still tell which rows they saw before.
+
+def staging_format() -> str:
+    fmt = os.environ.get("STAGING_FORMAT", "parquet").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"STAGING_FORMAT must be one of {FORMATS}, got {fmt!r}")
+    return fmt
+
+def sales_chunk_size() -> int:
+    # SALES_CHUNK_SIZE > 0 streams table_sales through transform and load in
+    # chunks of that many rows instead of holding it in memory
+    return int(os.environ.get("SALES_CHUNK_SIZE") or 0)
+
+def table_file(name: str, root: str | Path = STAGING_DIR, fmt: str | None = None) -> Path:
+    return Path(root) / f"{name}.{fmt or staging_format()}"
+
+def table_exists(name: str, root: str | Path = STAGING_DIR) -> bool:
+    root = Path(root)
+    return (root / name).is_dir() or any(table_file(name, root, fmt).exists() for fmt in FORMATS)
+
+def table_parts(name: str, root: str | Path = STAGING_DIR) -> List[Path]:
+    directory = Path(root) / name
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.iterdir() if path.suffix.lstrip(".") in FORMATS)
+
+def list_tables(root: str | Path = STAGING_DIR) -> List[str]:
+    root = Path(root)
+    if not root.exists():
+        return []
+    names = set()
+    for path in root.iterdir():
+        if path.is_dir() and table_parts(path.name, root):
+            names.add(path.name)
+        elif path.suffix.lstrip(".") in FORMATS:
+            names.add(path.stem)
+    return sorted(names)
+
+def parse_date_columns(df: pd.DataFrame, parse_dates: List[str] | None) -> pd.DataFrame:
+    # typed frames keep their dates, but text dates written by an earlier
+    # stage are parsed the same way read_csv would
+    for column in parse_dates or []:
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            try:
+                df[column] = pd.to_datetime(df[column])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+def read_file(path: Path, columns: List[str] | None = None, parse_dates: List[str] | None = None) -> pd.DataFrame:
+    if path.suffix == ".parquet":
+        return parse_date_columns(pd.read_parquet(path, columns=columns), parse_dates)
+    return pd.read_csv(path, usecols=columns, parse_dates=parse_dates)
+
+def read_table(name: str, columns: List[str] | None = None, parse_dates: List[str] | None = None, root: str | Path = STAGING_DIR) -> pd.DataFrame:
+    root = Path(root)
+    if _catalog is not None and _catalog.root == root:
+        return _catalog.read(name, columns, parse_dates)
+    return read_disk(name, columns, parse_dates, root)
+
+def read_disk(name: str, columns: List[str] | None = None, parse_dates: List[str] | None = None, root: str | Path = STAGING_DIR) -> pd.DataFrame:
+    # the dtype policy is for pipeline tables, caches keep what they stored
+    if memory_budget() and Path(root) == STAGING_DIR:
+        return read_compact(name, columns, parse_dates, root)
+    return read_stored(name, columns, parse_dates, root)
+
+def read_compact(name: str, columns: List[str] | None = None, parse_dates: List[str] | None = None, root: str | Path = STAGING_DIR) -> pd.DataFrame:
+    # a table read under the dtype policy. Parquet tables are read a column
+    # at a time and a batch at a time, so Arrow never holds more than one
+    # batch of a column next to the pandas copy, and each column is compacted
+    # before the next is read. Text columns come out of Parquet
+    # dictionary-encoded, straight into categoricals
+    files = stored_files(name, root)
+    if any(path.suffix != ".parquet" for path in files):
+        return compact_frame(read_stored(name, columns, parse_dates, root), name)
+
+    policies = DTYPE_POLICIES.get(name, {})
+    names = columns or pq.read_schema(files[0]).names
+    compacted, before, after = {}, 0, 0
+    for column in names:
+        # dates to parse are read as text, pd.to_datetime keeps a categorical one
+        categorical = policies.get(column) in (None, "category") and column not in (parse_dates or [])
+        values = read_column(files, column, categorical)
+        values = parse_date_columns(values.to_frame(), parse_dates)[column]
+        before += values.memory_usage(index=False, deep=True)
+        compacted[column] = compact_column(values, policies.get(column) or column_policy(values))
+        after += compacted[column].memory_usage(index=False, deep=True)
+        del values
+
+    print(f"Memory budget {name}: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB")
+    return pd.DataFrame(compacted, columns=names)
+
+def read_column(files: List[Path], column: str, categorical: bool) -> pd.Series:
+    # one column of a Parquet table, as read_stored would give it. With
+    # categorical, repeated text comes back as a categorical with sorted
+    # categories, as astype("category") gives them. Whether the text repeats
+    # is judged from a first batch read plain, so a mostly distinct column
+    # never has a dictionary built for it
+    if categorical:
+        first = next(pq.ParquetFile(files[0]).iter_batches(batch_size=READ_BATCH_ROWS, columns=[column]), None)
+        categorical = (first is not None and pa.types.is_string(first.column(0).type)
+                       and pc.count_distinct(first.column(0)).as_py() <= CATEGORY_MAX_RATIO * first.num_rows)
+    parts, stored = [], False
+    for path in files:
+        # the file's own schema carries the pandas metadata, so extension
+        # dtypes written by an earlier stage come back as they were
+        schema = pq.read_schema(path)
+        stored = pa.types.is_dictionary(schema.field(column).type)
+        if stored:
+            # already a categorical, compact as it is, and read whole so its
+            # categories keep their order
+            parts.append(pq.read_table(path, columns=[column]).to_pandas(self_destruct=True)[column])
+            continue
+        parquet = pq.ParquetFile(path, read_dictionary=[column] if categorical else None)
+        for batch in parquet.iter_batches(batch_size=READ_BATCH_ROWS, columns=[column]):
+            table = pa.Table.from_batches([batch]).replace_schema_metadata(schema.metadata)
+            parts.append(table.to_pandas(self_destruct=True)[column])
+    if not parts:
+        return pd.Series([], name=column, dtype=object)
+    if categorical and not stored and all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+        values = pd.Series(union_categoricals(parts, sort_categories=True), name=column)
+        if len(values.cat.categories) <= CATEGORY_MAX_RATIO * len(values):
+            return values
+        # the first batch repeated, the table as a whole does not
+        return values.astype(object).where(values.notna(), None)
+    # parts that stored the column as text in one and numbers in another
+    # come back mixed, pd.concat gives object then, as read_stored does
+    return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+def read_stored(name: str, columns: List[str] | None = None, parse_dates: List[str] | None = None, root: str | Path = STAGING_DIR) -> pd.DataFrame:
+    frames = [read_file(path, columns, parse_dates) for path in stored_files(name, root)]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+def stored_files(name: str, root: str | Path = STAGING_DIR) -> List[Path]:
+    # the files a table is read from, in order
+    root = Path(root)
+    if (root / name).is_dir():
+        return table_parts(name, root)
+
+    preferred = staging_format()
+    for fmt in (preferred, *[other for other in FORMATS if other != preferred]):
+        path = table_file(name, root, fmt)
+        if path.exists():
+            return [path]
+    raise FileNotFoundError(f"Staging table {name!r} not found in {root}")
+
+def stored_blocks(name: str, root: str | Path = STAGING_DIR) -> List[Tuple[str, int]] | None:
+    # the blocks of a table on disk. A file written with blocks declares
+    # them, and what follows them is left out; any other file is one block,
+    # identified by the file's name, size and modification time so a file
+    # rewritten with other rows gets a new one. None for CSV files, whose rows
+    # cannot be counted without reading them
+    blocks = []
+    for path in stored_files(name, root):
+        if path.suffix != ".parquet":
+            return None
+        metadata = pq.ParquetFile(path).metadata
+        declared = (metadata.metadata or {}).get(BLOCKS_METADATA_KEY)
+        if declared is not None:
+            return blocks + [(signature, rows) for signature, rows in json.loads(declared)]
+        stat = path.stat()
+        blocks.append((f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}", metadata.num_rows))
+    return blocks
+
+def table_blocks(name: str, root: str | Path = STAGING_DIR) -> List[Tuple[str, int]] | None:
+    # the blocks of a table as the active catalog holds it, else as stored
+    root = Path(root)
+    if _catalog is not None and _catalog.root == root:
+        return _catalog.table_blocks(name)
+    return stored_blocks(name, root) if table_exists(name, root) else None
+
+def iter_table(name: str, chunk_size: int, columns: List[str] | None = None, parse_dates: List[str] | None = None, root: str | Path = STAGING_DIR) -> Iterator[pd.DataFrame]:
+    # the table in chunks of at most chunk_size rows, read from disk as they
+    # are consumed (a table the active catalog holds is sliced instead).
+    # Parquet chunks keep the table's types; CSV chunks infer theirs chunk by chunk
+    root = Path(root)
+    if _catalog is not None and _catalog.root == root and name in _catalog.tables:
+        stored = _catalog.tables[name]
+        if isinstance(stored, StoredTable):
+            yield from iter_stored(stored.name, chunk_size, columns, parse_dates, stored.root)
+            return
+        df = _catalog.read(name, columns, parse_dates)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+    yield from iter_stored(name, chunk_size, columns, parse_dates, root)
+
+def iter_stored(name: str, chunk_size: int, columns: List[str] | None = None, parse_dates: List[str] | None = None, root: str | Path = STAGING_DIR) -> Iterator[pd.DataFrame]:
+    for path in stored_files(name, root):
+        if path.suffix == ".parquet":
+            with pq.ParquetFile(path) as parquet:
+                for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+                    yield parse_date_columns(pa.Table.from_batches([batch]).to_pandas(), parse_dates)
+        else:
+            with pd.read_csv(path, usecols=columns, parse_dates=parse_dates, chunksize=chunk_size) as reader:
+                yield from reader
+
+def read_matching(name: str, column: str, values: List, columns: List[str] | None = None, root: str | Path = STAGING_DIR) -> pd.DataFrame:
+    # the rows whose `column` is one of `values`, without reading the table
+    # whole: Parquet files are filtered as they are read (row groups whose
+    # statistics rule every value out are skipped), CSV files chunk by chunk,
+    # where a value also matches its text ("101" read back as 101)
+    values = list(values)
+    texts = [str(value) for value in values]
+    frames = []
+    for path in stored_files(name, root) if values else []:
+        if path.suffix == ".parquet":
+            frames.append(pq.read_table(path, columns=columns, filters=[(column, "in", values)]).to_pandas())
+        else:
+            with pd.read_csv(path, chunksize=LOOKUP_CHUNK_ROWS) as reader:
+                for chunk in reader:
+                    chunk = chunk[chunk[column].isin(values) | chunk[column].astype(str).isin(texts)]
+                    frames.append(chunk[columns] if columns else chunk)
+    if not frames:
+        return pd.DataFrame(columns=columns or [column])
+    return pd.concat(frames, ignore_index=True)
+
+def write_table(df: pd.DataFrame, name: str, root: str | Path = STAGING_DIR, blocks: List[Tuple[str, int]] | None = None) -> None:
+    # `blocks`: the blocks df's leading rows still are, when it was rewritten
+    # from a table that had them
+    if _catalog is not None and _catalog.root == Path(root):
+        _catalog.write(df, name, blocks)
+        return
+    write_disk(df, name, root, blocks)
+
+def write_disk(df: pd.DataFrame, name: str, root: str | Path = STAGING_DIR, blocks: List[Tuple[str, int]] | None = None) -> None:
+    with TableWriter(name, root, blocks=blocks) as writer:
+        writer.write(df)
+
+def remove_table(name: str, root: str | Path = STAGING_DIR) -> None:
+    root = Path(root)
+    if _catalog is not None and _catalog.root == root:
+        _catalog.discard(name)
+    if (root / name).is_dir():
+        shutil.rmtree(root / name)
+    for fmt in FORMATS:
+        table_file(name, root, fmt).unlink(missing_ok=True)
+
+def copy_table(name: str, source_root: str | Path, target_root: str | Path = STAGING_DIR) -> None:
+    source_root, target_root = Path(source_root), Path(target_root)
+    target_root.mkdir(parents=True, exist_ok=True)
+    remove_table(name, target_root)
+    if (source_root / name).is_dir():
+        shutil.copytree(source_root / name, target_root / name)
+        return
+    for fmt in FORMATS:
+        if table_file(name, source_root, fmt).exists():
+            shutil.copyfile(table_file(name, source_root, fmt), table_file(name, target_root, fmt))
+
+def stage_table(name: str, source_root: str | Path, root: str | Path = STAGING_DIR) -> None:
+    # a table written to disk out of core (under source_root) becomes the
+    # staging table `name`: the active catalog moves it in on flush like any
+    # table written to it, without a catalog it is moved in right away
+    if _catalog is not None and _catalog.root == Path(root):
+        _catalog.write(StoredTable(name, Path(source_root)), name)
+        return
+    move_table(name, source_root, root)
+
+def move_table(name: str, source_root: str | Path, target_root: str | Path = STAGING_DIR) -> None:
+    # like copy_table, but the files are renamed into place
+    source_root, target_root = Path(source_root), Path(target_root)
+    target_root.mkdir(parents=True, exist_ok=True)
+    if (target_root / name).is_dir():
+        shutil.rmtree(target_root / name)
+    for fmt in FORMATS:
+        table_file(name, target_root, fmt).unlink(missing_ok=True)
+    if (source_root / name).is_dir():
+        os.replace(source_root / name, target_root / name)
+        return
+    for fmt in FORMATS:
+        if table_file(name, source_root, fmt).exists():
+            os.replace(table_file(name, source_root, fmt), table_file(name, target_root, fmt))
+
+def export_csv(names: List[str] | None = None, out_dir: str | Path = STAGING_DIR / "csv", root: str | Path = STAGING_DIR) -> None:
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name in names or list_tables(root):
+        read_table(name, root=root).to_csv(out_dir / f"{name}.csv", index=False)
+
+def infer_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    # scraped / OCR'd text gets the dtypes reading it back from CSV used to
+    # give, converting only the text columns instead of the whole frame
+    df = df.copy(deep=False)
+    for column in df.columns[df.dtypes == object]:
+        df[column] = infer_column(df[column])
+    return df
+
+def infer_column(values: pd.Series) -> pd.Series:
+    # blank text is missing; all-numeric text becomes int64 / float64 and
+    # True/False text bool, as pd.read_csv would parse the column
+    text = values.mask(values.map(lambda value: isinstance(value, str) and not value.strip()))
+    present = text.dropna()
+    if present.empty:
+        return text.astype("float64")
+    if len(present) == len(text) and present.isin(["True", "False", True, False]).all():
+        return text.isin(["True", True])
+    try:
+        return pd.to_numeric(text)
+    except (ValueError, TypeError):
+        return text
+
+def fingerprint(*frames: pd.DataFrame) -> str:
+    # content hash of the frames' values and column names, row order included
+    digest = hashlib.sha256()
+    for df in frames:
+        digest.update("\x1f".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def to_arrow(df: pd.DataFrame, schema: pa.Schema | None = None) -> pa.Table:
+    if schema is not None:
+        return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    df = df.copy(deep=False)
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # mixed Python types (e.g. dates and text in one Excel column) are
+            # kept as text, which is what the CSV round-trip produced
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for index, field in enumerate(table.schema):
+        # all-null columns get a real type so later chunks/parts can match it
+        if pa.types.is_null(field.type):
+            table = table.set_column(index, field.name, table.column(index).cast(pa.string()))
+    return table
+
+class StoredTable(NamedTuple):
+    # a table the catalog leaves on disk (too big to hold), under root
+    name: str
+    root: Path
+
+class StagingCatalog:
+    # keeps staging tables resident while a run is active: a table is loaded
+    # from disk on first read, writes replace the in-memory frame and are only
+    # written out by flush(). A catalog created with `tables` is closed: it
+    # only knows those tables and never touches disk. Tables kept on disk
+    # (StoredTable) are read from their files, and moved into staging on flush
+    # when they were written. The blocks of each table travel with it
+    def __init__(self, root: str | Path = STAGING_DIR, tables: Dict[str, pd.DataFrame | StoredTable] | None = None,
+                 blocks: Dict[str, List[Tuple[str, int]] | None] | None = None) -> None:
+        self.root = Path(root)
+        self.closed = tables is not None
+        self.tables: Dict[str, pd.DataFrame | StoredTable] = dict(tables or {})
+        self.blocks: Dict[str, List[Tuple[str, int]] | None] = dict(blocks or {})
+        self.dirty: List[str] = []
+
+    def entry(self, name: str) -> pd.DataFrame | StoredTable:
+        # what the catalog holds for the table, loaded on first use; not a
+        # copy, it is for handing tables to the steps
+        if name not in self.tables:
+            if self.closed:
+                raise KeyError(f"Staging table {name!r} is not available here (not declared as an input?)")
+            self.tables[name] = read_disk(name, root=self.root)
+            self.blocks[name] = stored_blocks(name, self.root)
+        return self.tables[name]
+
+    def table_blocks(self, name: str) -> List[Tuple[str, int]] | None:
+        stored = self.entry(name)
+        if isinstance(stored, StoredTable):
+            return stored_blocks(stored.name, stored.root)
+        return self.blocks.get(name)
+
+    def keep_on_disk(self, name: str) -> None:
+        # the table is read from its files by whoever needs it, never loaded
+        if name not in self.tables:
+            self.tables[name] = StoredTable(name, self.root)
+
+    def read(self, name: str, columns: List[str] | None = None, parse_dates: List[str] | None = None) -> pd.DataFrame:
+        df = self.entry(name)
+        if isinstance(df, StoredTable):
+            return read_disk(df.name, columns, parse_dates, df.root)
+        # callers modify what they read, so they get their own copy
+        df = df[columns].copy() if columns is not None else df.copy()
+        return parse_date_columns(df, parse_dates)
+
+    def write(self, df: pd.DataFrame | StoredTable, name: str, blocks: List[Tuple[str, int]] | None = None) -> None:
+        # tables built during the run are compacted like the ones read from disk
+        if memory_budget() and self.root == STAGING_DIR and not isinstance(df, StoredTable):
+            df = compact_frame(df, name)
+        self.tables[name] = df
+        self.blocks[name] = blocks
+        if name in self.dirty:
+            self.dirty.remove(name)
+        self.dirty.append(name)
+
+    def written(self) -> Dict[str, pd.DataFrame | StoredTable]:
+        return {name: self.tables[name] for name in self.dirty}
+
+    def written_blocks(self) -> Dict[str, List[Tuple[str, int]] | None]:
+        return {name: self.blocks.get(name) for name in self.dirty}
+
+    def discard(self, name: str) -> None:
+        self.tables.pop(name, None)
+        self.blocks.pop(name, None)
+        if name in self.dirty:
+            self.dirty.remove(name)
+
+    def flush(self, names: List[str] | None = None) -> None:
+        if self.closed:
+            return
+        for name in [name for name in self.dirty if names is None or name in names]:
+            stored = self.tables[name]
+            if isinstance(stored, StoredTable):
+                move_table(stored.name, stored.root, self.root)
+                self.tables[name] = StoredTable(name, self.root)
+            else:
+                write_disk(stored, name, self.root, self.blocks.get(name))
+            self.dirty.remove(name)
+
+_catalog: StagingCatalog | None = None
+
+@contextmanager
+def staging_catalog(root: str | Path = STAGING_DIR, tables: Dict[str, pd.DataFrame | StoredTable] | None = None,
+                    blocks: Dict[str, List[Tuple[str, int]] | None] | None = None) -> Iterator[StagingCatalog]:
+    # tables written inside the block reach disk on flush() and when the block
+    # ends without an error; after a failure staging keeps what was last flushed.
+    # An inner block shadows the outer catalog until it ends
+    global _catalog
+    outer = _catalog
+    _catalog = StagingCatalog(root, tables, blocks)
+    try:
+        yield _catalog
+        _catalog.flush()
+    finally:
+        _catalog = outer
+
+class TableWriter:
+    # writes a table chunk by chunk into a temporary file that replaces the
+    # target on close; with `part`, the file is one part of a directory table.
+    # `blocks` are recorded in a Parquet file's metadata (CSV has nowhere to keep them)
+    def __init__(self, name: str, root: str | Path = STAGING_DIR, part: str | None = None, schema: pa.Schema | None = None,
+                 blocks: List[Tuple[str, int]] | None = None) -> None:
+        self.name = name
+        self.blocks = blocks
+        self.root = Path(root)
+        self.part = part
+        self.fmt = staging_format()
+        self.schema = schema
+        self.rows = 0
+
+        if part is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.path = table_file(name, self.root, self.fmt)
+        else:
+            (self.root / name).mkdir(parents=True, exist_ok=True)
+            self.path = self.root / name / f"{part}.{self.fmt}"
+        self.tmp_path = Path(f"{self.path}.part")
+        self.writer = None
+        self.started = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.fmt == "csv":
+            df.to_csv(self.tmp_path, mode="a" if self.started else "w", header=not self.started, index=False)
+        else:
+            table = to_arrow(df, self.schema)
+            if self.writer is None:
+                self.schema = table.schema
+                self.writer = pq.ParquetWriter(self.tmp_path, self.schema, compression=PARQUET_COMPRESSION)
+            elif not table.schema.equals(self.schema):
+                table = table.cast(self.schema)
+            self.writer.write_table(table)
+        self.started = True
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if not self.started:
+            raise ValueError(f"Nothing was written to staging table {self.name!r}")
+        if self.writer is not None:
+            if self.blocks is not None:
+                self.writer.add_key_value_metadata({BLOCKS_METADATA_KEY: json.dumps(self.blocks)})
+            self.writer.close()
+
+        if self.part is None:
+            # a single-file table replaces any other representation of itself
+            if (self.root / self.name).is_dir():
+                shutil.rmtree(self.root / self.name)
+            for fmt in FORMATS:
+                if fmt != self.fmt:
+                    table_file(self.name, self.root, fmt).unlink(missing_ok=True)
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self) -> "TableWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
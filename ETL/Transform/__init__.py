@@ -1,9 +1,9 @@
-from typing import Dict
+from typing import Dict, List
 from .helper_functions import clean_date
 from .transform_files import transform_erp
 
 clean_date = clean_date
-def transfrom() -> None:
+def transfrom(checkpoints: List[str] | None = None, workers: int = 1) -> None:
     print("TRANSFROMING ERP")
-    transform_erp()
+    transform_erp(checkpoints, workers)
     print("DONE TRANSFROMING ERP")
\ No newline at end of file
@@ -0,0 +1,168 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import pandas as pd
+
+from .helper_functions import (
+    DATE_FORMATS,
+    guess_row,
+    non_negative,
+    id_number,
+    parse_dates,
+    title_name,
+    parse_number
+)
+
+# A cleaning plan lists the columns of a table and how each one is cleaned:
+#
+#   "Store_ID: id; Month: date; Target_Revenue: number; Manager_Name: name"
+#
+# Steps of one column run left to right ("Cost: number, non_negative"). The
+# text steps (id, number, name, date) each clean the column in a single pass
+# over its distinct values; columns do not depend on each other, so they are
+# cleaned side by side.
+CLEANING_PLANS = {
+    "marketing_expenses": "Date: date; Marketing_Cost_USD: number, non_negative; Category: name; Campaign_Type: name",
+    "monthly_targets": "Store_ID: id; Month: date; Target_Revenue: number; Manager_Name: name",
+    "table_sales_ids": "Trans_ID: id",
+    "table_sales": "Customer_ID: id; Product_ID: id; Date: date",
+    "table_products": "Product_ID: id",
+    "table_customers": "Customer_ID: id",
+}
+
+CLEANING_WORKERS = 4
+# per date column ("table.column"), how many rows each date format parsed so far
+DATE_FORMATS_DIR = Path("cache") / "date_formats"
+
+ColumnStep = Callable[[pd.Series, str], pd.Series]
+
+COLUMN_STEPS: Dict[str, ColumnStep] = {
+    "id": lambda column, source: id_number(column),
+    "date": lambda column, source: parse_dates(column),
+    "number": lambda column, source: parse_number(column),
+    "name": lambda column, source: title_name(column),
+    "non_negative": lambda column, source: non_negative(column),
+}
+
+def parse_plan(plan: str) -> List[Tuple[str, List[str]]]:
+    columns = []
+    for entry in plan.split(";"):
+        if not entry.strip():
+            continue
+        column, _, steps = entry.partition(":")
+        steps = [step.strip() for step in steps.split(",") if step.strip()]
+        unknown = [step for step in steps if step not in COLUMN_STEPS]
+        if not column.strip() or not steps or unknown:
+            raise ValueError(f"Bad cleaning plan entry {entry.strip()!r}" + (f", unknown steps: {', '.join(unknown)}" if unknown else ""))
+        columns.append((column.strip(), steps))
+    return columns
+
+class DateLog:
+    # the date columns of one table: the fixed formats are tried most used
+    # first (per column, over earlier runs; no two can match the same text,
+    # so the order only saves passes), and the rows each way parsed are
+    # printed and saved once the whole table is cleaned
+    def __init__(self) -> None:
+        self.learned: Dict[str, Dict[str, int]] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def parse(self, column: pd.Series, source: str) -> pd.Series:
+        if source not in self.learned:
+            self.learned[source] = load_date_formats(source)
+            self.counts[source] = {}
+        learned = self.learned[source]
+        return parse_dates(column, sorted(DATE_FORMATS, key=lambda fmt: -learned.get(fmt, 0)), self.counts[source])
+
+    def save(self) -> None:
+        for source, counts in self.counts.items():
+            learned = self.learned[source]
+            for way, count in counts.items():
+                learned[way] = learned.get(way, 0) + count
+            save_date_formats(source, learned)
+            print(f"clean_date {source}: " + ", ".join(f"{count} {way}" for way, count in counts.items()))
+        self.counts = {source: {} for source in self.counts}
+
+def load_date_formats(source: str) -> Dict[str, int]:
+    path = DATE_FORMATS_DIR / f"{source}.json"
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_date_formats(source: str, counts: Dict[str, int]) -> None:
+    DATE_FORMATS_DIR.mkdir(parents=True, exist_ok=True)
+    path = DATE_FORMATS_DIR / f"{source}.json"
+    with open(f"{path}.part", "w", encoding="utf-8") as f:
+        json.dump(counts, f, indent=2)
+    os.replace(f"{path}.part", path)
+
+def clean_table(df: pd.DataFrame, name: str, plan: str | None = None, dates: DateLog | None = None) -> pd.DataFrame:
+    # cleans df in place with CLEANING_PLANS[name] (or `plan`) and returns it.
+    # Date columns are logged to `dates` when the table is cleaned in parts,
+    # else once here
+    log = dates or DateLog()
+    columns = parse_plan(plan or CLEANING_PLANS[name])
+    missing = [column for column, _ in columns if column not in df.columns]
+    if missing:
+        raise KeyError(f"Cleaning plan for {name} names missing columns: {', '.join(missing)}")
+
+    def run(column: str, steps: List[str]) -> pd.Series:
+        values = df[column]
+        for step in steps:
+            source = f"{name}.{column}"
+            values = log.parse(values, source) if step == "date" else COLUMN_STEPS[step](values, source)
+        return values
+
+    if len(columns) == 1:
+        cleaned = [run(*columns[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(CLEANING_WORKERS, len(columns))) as pool:
+            cleaned = list(pool.map(lambda entry: run(*entry), columns))
+
+    for (column, _), values in zip(columns, cleaned):
+        df[column] = values
+    if dates is None:
+        log.save()
+    return df
+
+def clean_chunks(chunks: Iterable[pd.DataFrame], name: str, plan: str | None = None) -> Iterator[pd.DataFrame]:
+    # cleans a table arriving in chunks the way clean_table cleans it whole.
+    # Every step is row by row except the generic date parse, which guesses
+    # its format from the column's first usable value (guess_row): the row
+    # holding it is cleaned in front of every later chunk, and dropped again
+    plan = plan or CLEANING_PLANS[name]
+    pending = [column for column, steps in parse_plan(plan) if "date" in steps]
+    head = None
+    log = DateLog()
+
+    for chunk in chunks:
+        positions = {column: guess_row(chunk[column]) for column in pending}
+        pending = [column for column in pending if positions[column] < 0]
+        leading = chunk.iloc[sorted({position for position in positions.values() if position >= 0})].copy()
+
+        if head is None:
+            cleaned = clean_table(chunk, name, plan, log)
+        else:
+            cleaned = clean_table(pd.concat([head, chunk], ignore_index=True), name, plan, log).iloc[len(head):]
+            cleaned.index = chunk.index
+
+        if len(leading):
+            head = leading if head is None else pd.concat([head, leading], ignore_index=True)
+        yield cleaned
+    log.save()
+
+def clean_rows(df: pd.DataFrame, rows: pd.DataFrame, name: str, plan: str | None = None) -> pd.DataFrame:
+    # rows taken from df, cleaned the way clean_table would clean them as part
+    # of the whole df: behind the rows of df each date column guesses its
+    # format from, like clean_chunks does
+    plan = plan or CLEANING_PLANS[name]
+    dates = [column for column, steps in parse_plan(plan) if "date" in steps]
+    head = df.iloc[sorted({guess_row(df[column]) for column in dates} - {-1})]
+
+    if head.empty:
+        return clean_table(rows.copy(), name, plan)
+    cleaned = clean_table(pd.concat([head, rows], ignore_index=True), name, plan).iloc[len(head):]
+    cleaned.index = rows.index
+    return cleaned
@@ -1,95 +1,168 @@
+import re
+import numpy as np
 import pandas as pd
+from typing import Callable, Dict, List
 USD_TO_DZD = 135.0
 
+# fallback formats clean_date tries after the generic parse: YYYY-MM-DD (after
+# dot->dash normalization), MM-DD-YYYY, Month Day, Year (March 3, 2021) and
+# Mon-YYYY (Feb-2023 -> 2023-02-01)
+DATE_FORMATS = ["%Y-%m-%d", "%m-%d-%Y", "%B %d, %Y", "%b-%Y"]
+# text the generic parse passes over when it picks the value it guesses the
+# format of the whole column from (pandas' first_non_null)
+UNGUESSABLE_DATES = {"", "nan", "NaN", "NAN", "NaT", "nat", "NAT", "now", "today"}
+NON_DIGITS = re.compile(r'\D')
+
+# The frame helpers below replace the cleaned columns in the frame they are
+# given and return it; the column functions they use work on one Series.
+
 def handle_neg_values(df, column_names = []) -> pd.DataFrame:
     for column in column_names:
-        df[column] = df[column].apply(lambda x: x if x >= 0 else None)
+        df[column] = non_negative(df[column])
     return df
 
+def non_negative(column: pd.Series) -> pd.Series:
+    # negatives -> NULL; numpy numeric columns come out of where() with the
+    # dtype the element-wise version gave, anything else keeps that version
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind in "biuf":
+        return column.where(column >= 0)
+    return column.apply(lambda x: x if x >= 0 else None)
+
 def clean_id(df, column_name) -> pd.DataFrame:
-    df[column_name] = df[column_name].astype(str).str.replace(r'\D', '', regex=True)
-    df[column_name] = pd.to_numeric(df[column_name], errors='coerce')
+    df[column_name] = id_number(df[column_name])
     return df
 
+def id_number(column: pd.Series) -> pd.Series:
+    return map_distinct(
+        column,
+        lambda s: s.astype(str),
+        lambda text: NON_DIGITS.sub('', text),
+        lambda s: pd.to_numeric(s, errors='coerce')
+    )
+
 def clean_date(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
-    df = df.copy()
-    s = df[column_name].astype(str).str.strip()
+    df[column_name] = parse_dates(df[column_name])
+    return df
 
+def parse_dates(column: pd.Series, formats: List[str] | None = None, counts: Dict[str, int] | None = None) -> pd.Series:
+    # the generic parse, then the fixed `formats` (DATE_FORMATS) in order on
+    # what is left; the rows each way parsed are added to `counts`. Every
+    # distinct value is parsed once and mapped back by its code; missing
+    # values share one extra code and come out as NaT, like "nan" did before
+    codes, uniques = pd.factorize(column)
+    missing = codes < 0
+    codes[missing] = len(uniques)
+    rows = np.bincount(codes, minlength=len(uniques) + 1)
+
+    # the generic parse guesses its format from the column's first usable
+    # text, which can be a missing value's ("None"): it goes in front of the
+    # distinct values so they are guessed the same
+    first = guess_row(column)
+    lead = list(column.iloc[first:first + 1].astype(str)) if first >= 0 else []
+    s = date_texts(pd.Series(lead + list(uniques.astype(str)) + ["nan"]))
+
+    parsed = pd.to_datetime(s, errors="coerce").iloc[len(lead):].reset_index(drop=True)
+    s = s.iloc[len(lead):].reset_index(drop=True)
+    found = {"inferred": int(rows[parsed.notna().to_numpy()].sum())}
+
+    for fmt in formats or DATE_FORMATS:
+        mask = parsed.isna()
+        if not mask.any():
+            break
+        parsed.loc[mask] = pd.to_datetime(s[mask], format=fmt, errors="coerce")
+        found[fmt] = int(rows[(mask & parsed.notna()).to_numpy()].sum())
+    found["failed"] = int(rows[parsed.isna().to_numpy()].sum())
+
+    if counts is not None:
+        for way, count in found.items():
+            counts[way] = counts.get(way, 0) + count
+    return pd.Series(parsed.to_numpy()[codes], index=column.index, name=column.name)
+
+def date_texts(column: pd.Series) -> pd.Series:
     # normalize separators: 2021.02.28 -> 2021-02-28
-    s = s.str.replace(r"\.", "-", regex=True)
-
-    parsed = pd.to_datetime(s, errors="coerce")
-
-    # YYYY-MM-DD (after dot->dash normalization)
-    mask = parsed.isna()
-    parsed_y = pd.to_datetime(s[mask], format="%Y-%m-%d", errors="coerce")
-    parsed.loc[mask] = parsed_y
-
-    # MM-DD-YYYY
-    mask = parsed.isna()
-    parsed_mdy = pd.to_datetime(s[mask], format="%m-%d-%Y", errors="coerce")
-    parsed.loc[mask] = parsed_mdy
-
-    # Month Day, Year (March 3, 2021)
-    mask = parsed.isna()
-    parsed_long = pd.to_datetime(s[mask], format="%B %d, %Y", errors="coerce")
-    parsed.loc[mask] = parsed_long
-
-    # Mon-YYYY (Feb-2023) -> 2023-02-01
-    mask = parsed.isna()
-    parsed_mon_year = pd.to_datetime(s[mask], format="%b-%Y", errors="coerce")
-    parsed.loc[mask] = parsed_mon_year
-
-    df[column_name] = parsed
-    return df
+    return column.astype(str).str.strip().str.replace(".", "-", regex=False)
+
+def guess_row(column: pd.Series) -> int:
+    # position of the value the generic parse of the column guesses its
+    # format from, -1 when there is none; looked for in growing windows so a
+    # long column is not converted to text whole
+    start, size = 0, 1024
+    while start < len(column):
+        usable = ~date_texts(column.iloc[start:start + size]).isin(UNGUESSABLE_DATES).to_numpy()
+        if usable.any():
+            return start + int(np.argmax(usable))
+        start, size = start + size, size * 2
+    return -1
 
 def usd_to_dzd(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
-    df = df.copy()
-
-    df[column_name] = df[column_name] * USD_TO_DZD
+    df[column_name] = dzd_from_usd(df[column_name])
 
     new_column_name = column_name.replace("USD", "DZD").replace("usd", "dzd")
     df.rename(columns={column_name: new_column_name}, inplace=True)
 
     return df
 
+def dzd_from_usd(column: pd.Series) -> pd.Series:
+    return column * USD_TO_DZD
+
 def standarize_names(df: pd.DataFrame, column_names=[]) -> pd.DataFrame:
-    df = df.copy()
     for column in column_names:
-        df[column] = (
-            df[column]
-            .astype(str)
-            .str.replace("_", " ", regex=False)
-            .str.replace("-", " ", regex=False) 
-            .str.strip()
-            .str.title()
-        )
+        df[column] = title_name(df[column])
     return df
 
+def title_name(column: pd.Series) -> pd.Series:
+    return map_distinct(
+        column,
+        lambda s: s.astype(str),
+        lambda text: text.replace("_", " ").replace("-", " ").strip().title()
+    )
+
 def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df = df.drop_duplicates(keep='first')
-    return df
+    return df.drop_duplicates(keep='first')
 
 
 def normalize_number(df: pd.DataFrame, column_names) -> pd.DataFrame:
-    df = df.copy()
-
     for col in column_names:
-        s = df[col].astype("string")  # better than astype(str), preserves <NA>
-
-        # remove currency text/symbols if they exist (optional)
-        s = s.str.replace("USD", "", regex=False).str.replace("$", "", regex=False).str.strip()
-
-        # remove spaces (thousand sep)
-        s = s.str.replace(" ", "", regex=False)
-
-        # if decimal comma is used, convert it to dot
-        # example: "1234,56" -> "1234.56"
-        s = s.str.replace(",", ".", regex=False)
-
-        df[col] = pd.to_numeric(s, errors="coerce")
-
+        df[col] = parse_number(df[col])
     return df
 
-
+def parse_number(column: pd.Series) -> pd.Series:
+    def clean(text):
+        if text is pd.NA:
+            return text
+        # remove currency text/symbols if they exist (optional), spaces
+        # (thousand sep), and turn a decimal comma into a dot:
+        # "1234,56" -> "1234.56"
+        return text.replace("USD", "").replace("$", "").strip().replace(" ", "").replace(",", ".")
+
+    return map_distinct(
+        column,
+        lambda s: s.astype("string"),  # better than astype(str), preserves <NA>
+        clean,
+        lambda s: pd.to_numeric(s.astype("string"), errors="coerce")
+    )
+
+def map_distinct(column: pd.Series, to_text: Callable[[pd.Series], pd.Series], clean: Callable, finish: Callable[[pd.Series], pd.Series] | None = None) -> pd.Series:
+    # runs all the string steps of a column in one go, once per distinct value:
+    # to_text converts the distinct values like it would the column, clean is
+    # the per-string work and finish the vectorized tail (e.g. to_numeric)
+    codes, uniques = pd.factorize(column)
+    missing = codes < 0
+
+    # the distinct values are converted as rows of the column, a missing one
+    # included: the column's dtype can change how they convert (categories
+    # convert as floats once the column has a missing value: 3 -> "3.0")
+    _, firsts = np.unique(codes, return_index=True)
+    sample = to_text(column.iloc[firsts])
+    texts = list(sample.iloc[1:] if missing.any() else sample)
+
+    # None, NaN, NaT... share the missing code but are different text
+    if missing.any():
+        missing_codes, missing_texts = pd.factorize(to_text(column[missing]), use_na_sentinel=False)
+        codes[missing] = len(texts) + missing_codes
+        texts += list(missing_texts)
+
+    result = pd.Series([clean(text) for text in texts], dtype=object)
+    if finish is not None:
+        result = finish(result)
+    return pd.Series(result.take(codes).array, index=column.index, name=column.name)
@@ -0,0 +1,164 @@
+import os
+import re
+import unicodedata
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# matches scoring below this are treated as no match (NAME_MATCH_THRESHOLD)
+MATCH_THRESHOLD = 0.9
+# tokens that name a model rather than describe it: anything with a digit
+# (14, 128gb, s23, g8) and single letters (Product A, Product B). Two names
+# only match when theirs are the same, however close the rest is
+MODEL_TOKEN = re.compile(r"\b(?:[a-z0-9]*[0-9][a-z0-9]*|[a-z])\b")
+# units written apart from their number ("128 GB") are joined to it first
+UNIT_SPACE = re.compile(r"(?<=[0-9]) (?=(?:gb|tb|mb|go|mo|ghz|mhz|hz|mah|mm|cm|kg|w)\b)")
+# candidate (query, name) pairs expanded at once, bounds the memory of match()
+MAX_CANDIDATE_PAIRS = 500_000
+
+def match_threshold() -> float:
+    return float(os.environ.get("NAME_MATCH_THRESHOLD") or MATCH_THRESHOLD)
+
+def normalize_name(name) -> str:
+    # "Écran  HP-24''" -> "ecran hp 24"
+    if not isinstance(name, str):
+        return ""
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", name.lower()).strip()
+
+def model_tokens(name: str) -> str:
+    # of a normalized name, sorted into one string so names compare as codes
+    return " ".join(sorted(set(MODEL_TOKEN.findall(UNIT_SPACE.sub("", name)))))
+
+def trigrams(name: str) -> List[str]:
+    if not name:
+        return []
+    padded = f" {name} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+class NameIndex:
+    # trigram inverted index over a list of names. match() scores names against
+    # it with the Dice coefficient of their trigram sets (2 * shared / total),
+    # among the names with the same model tokens; a query equal to a name once
+    # normalized takes that name without being scored.
+    # A name reaching the threshold t shares at least t * |q| / (2 - t) of the
+    # query's trigrams, so it has to share one of the query's rarest
+    # |q| - that + 1: only the postings of those are read to find candidates,
+    # which are then scored on all their trigrams
+    def __init__(self, names: Sequence) -> None:
+        self.names = list(names)
+        normalized = [normalize_name(name) for name in self.names]
+        # the first name of every normalized form
+        self.exact: Dict[str, int] = {}
+        for position, name in enumerate(normalized):
+            if name:
+                self.exact.setdefault(name, position)
+        self.model_codes: Dict[str, int] = {}
+        self.models = np.array([self.model_codes.setdefault(model_tokens(name), len(self.model_codes)) for name in normalized], dtype=np.int64)
+        self.vocabulary: Dict[str, int] = {}
+        docs, grams = self.encode(normalized, grow=True)
+        self.sizes = np.bincount(docs, minlength=len(self.names))
+
+        # docs of gram g are self.docs[self.offsets[g]:self.offsets[g + 1]]
+        self.postings = np.bincount(grams, minlength=len(self.vocabulary))
+        self.offsets = np.concatenate([[0], np.cumsum(self.postings)])
+        self.docs = docs[np.argsort(grams, kind="stable")]
+        # every (name, gram) as one sorted key, to check what a name contains
+        self.keys = np.sort(docs * len(self.vocabulary) + grams)
+
+    def encode(self, normalized: Sequence[str], grow: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        # (name position, trigram id) for every distinct trigram of every
+        # normalized name; trigrams the index has never seen get -1 when not
+        # growing
+        docs, grams = [], []
+        for position, name in enumerate(normalized):
+            for gram in trigrams(name):
+                if grow and gram not in self.vocabulary:
+                    self.vocabulary[gram] = len(self.vocabulary)
+                docs.append(position)
+                grams.append(self.vocabulary.get(gram, -1))
+        return np.array(docs, dtype=np.int64), np.array(grams, dtype=np.int64)
+
+    def match(self, queries: Sequence, threshold: float | None = None) -> pd.DataFrame:
+        # best name for every query: its position in the index and its score
+        # (-1 and NaN when nothing reaches the threshold); repeated queries are
+        # scored once
+        threshold = match_threshold() if threshold is None else threshold
+        codes, queries = pd.factorize(pd.Series(list(queries), dtype=object))
+        best = np.full(len(queries) + 1, -1)
+        scores = np.full(len(queries) + 1, np.nan)
+
+        normalized = [normalize_name(query) for query in queries]
+        exact = np.array([self.exact.get(name, -1) for name in normalized], dtype=np.int64)
+        found = np.flatnonzero(exact >= 0)
+        best[found], scores[found] = exact[found], 1.0
+        # (models no name has get -1 and match nothing)
+        query_models = np.array([self.model_codes.get(model_tokens(name), -1) for name in normalized], dtype=np.int64)
+
+        # only the queries without an exact match are scored
+        query_docs, query_grams = self.encode(["" if position >= 0 else name for name, position in zip(normalized, exact)])
+        # (an index of names without any trigram can match nothing)
+        if len(query_docs) and len(self.vocabulary):
+            # grams of each query rarest first (unknown ones count as rarest)
+            frequency = np.where(query_grams >= 0, self.postings[query_grams.clip(0)], 0)
+            order = np.lexsort((query_grams, frequency, query_docs))
+            query_docs, query_grams = query_docs[order], query_grams[order]
+            query_sizes = np.bincount(query_docs, minlength=len(queries))
+            query_starts = np.concatenate([[0], np.cumsum(query_sizes)])
+            rank = np.arange(len(query_docs)) - query_starts[query_docs]
+            needed = np.maximum(np.ceil(threshold * query_sizes / (2 - threshold) - 1e-9), 1)
+            prefix = (rank <= query_sizes[query_docs] - needed[query_docs]) & (query_grams >= 0)
+
+            # queries in batches of about MAX_CANDIDATE_PAIRS postings
+            cost = np.cumsum(np.bincount(query_docs[prefix], weights=self.postings[query_grams[prefix]], minlength=len(queries)))
+            first = 0
+            while first < len(queries):
+                done = cost[first - 1] if first else 0
+                last = max(int(np.searchsorted(cost, done + MAX_CANDIDATE_PAIRS, side="right")), first + 1)
+                self.best_matches(query_docs, query_grams, prefix, query_sizes, query_starts, needed, query_models, first, last, threshold, best, scores)
+                first = last
+
+        return pd.DataFrame({"Match": best[codes], "Score": scores[codes]})
+
+    def best_matches(self, query_docs, query_grams, prefix, query_sizes, query_starts, needed, query_models,
+                     first: int, last: int, threshold: float, best: np.ndarray, scores: np.ndarray) -> None:
+        # fills best/scores for queries first..last-1
+        window = slice(query_starts[first], query_starts[last])
+        blocking = prefix[window]
+        grams = query_grams[window][blocking]
+
+        # candidates: every name in the postings of the prefix grams, expanded
+        # without a Python loop
+        starts, lengths = self.offsets[grams], self.postings[grams]
+        pair_queries = np.repeat(query_docs[window][blocking], lengths)
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pair_names = self.docs[np.repeat(starts, lengths) + within]
+        pairs, hits = np.unique(pair_queries * len(self.names) + pair_names, return_counts=True)
+        pair_queries, pair_names = pairs // len(self.names), pairs % len(self.names)
+
+        # the grams past the prefix can add at most needed - 1 to the prefix
+        # hits; pairs that cannot reach the threshold even so are dropped, and
+        # so are names of another model
+        total = query_sizes[pair_queries] + self.sizes[pair_names]
+        most = np.minimum(hits + needed[pair_queries] - 1, np.minimum(query_sizes[pair_queries], self.sizes[pair_names]))
+        fits = (2 * most >= threshold * total - 1e-9) & (self.models[pair_names] == query_models[pair_queries])
+        pair_queries, pair_names = pair_queries[fits], pair_names[fits]
+        if len(pair_queries) == 0:
+            return
+
+        # shared grams: look every gram of the query up in the name's grams
+        sizes = query_sizes[pair_queries]
+        pair = np.repeat(np.arange(len(pair_queries)), sizes)
+        offset = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+        grams = query_grams[np.repeat(query_starts[pair_queries], sizes) + offset]
+        keys = pair_names[pair] * len(self.vocabulary) + grams
+        found = self.keys[np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)] == keys
+        shared = np.bincount(pair, weights=found & (grams >= 0), minlength=len(pair_queries))
+        dice = 2 * shared / (sizes + self.sizes[pair_names])
+
+        # highest score per query, the earliest name on ties
+        order = np.lexsort((pair_names, -dice, pair_queries))
+        top = order[np.r_[True, pair_queries[order][1:] != pair_queries[order][:-1]]]
+        top = top[dice[top] >= threshold]
+        best[pair_queries[top]] = pair_names[top]
+        scores[pair_queries[top]] = dice[top]
@@ -0,0 +1,149 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Set, Tuple
+import pandas as pd
+
+from ..Staging import StagingCatalog, StoredTable, staging_catalog, table_exists, write_table
+
+# (step, staging tables it reads, staging tables it writes)
+Step = Tuple[Callable[[], None], List[str], List[str]]
+# the blocks of a staging table (see staging_store)
+Blocks = List[Tuple[str, int]] | None
+
+# steps reading more than this go to the worker pool only if nothing else
+# feeds them; larger inputs are cheaper to transform here than to pickle
+POOL_INPUT_BYTES = 32 * 1024 * 1024
+
+def build_dag(steps: List[Step]) -> List[Set[int]]:
+    # the list order is the order the steps ran in serially: a step waits for
+    # every earlier step that writes what it reads, reads what it overwrites,
+    # or writes the same table
+    deps = []
+    for j, (_, reads_j, writes_j) in enumerate(steps):
+        deps.append({
+            i for i, (_, reads_i, writes_i) in enumerate(steps[:j])
+            if set(writes_i) & set(reads_j) or set(reads_i) & set(writes_j) or set(writes_i) & set(writes_j)
+        })
+    return deps
+
+def check_inputs(steps: List[Step]) -> None:
+    # inputs nobody produces have to be in staging before anything runs
+    produced = set()
+    missing = []
+    for step, reads, writes in steps:
+        missing += [f"{step.__name__}: {name}" for name in reads if name not in produced and not table_exists(name)]
+        produced.update(writes)
+    if missing:
+        raise FileNotFoundError(f"Missing staging tables: {', '.join(missing)}")
+
+def run_step(step: Callable[[], None], inputs: Dict[str, pd.DataFrame | StoredTable], blocks: Dict[str, Blocks],
+             writes: List[str]) -> Tuple[Dict[str, pd.DataFrame | StoredTable], Dict[str, Blocks], float]:
+    # the step only sees its declared inputs, and only its declared outputs are kept
+    start = time.perf_counter()
+    with staging_catalog(tables=inputs, blocks=blocks) as catalog:
+        step()
+    outputs = catalog.written()
+    undeclared = [name for name in outputs if name not in writes]
+    if undeclared:
+        raise RuntimeError(f"{step.__name__} wrote undeclared tables: {', '.join(undeclared)}")
+    return outputs, catalog.written_blocks(), time.perf_counter() - start
+
+def input_bytes(inputs: Dict[str, pd.DataFrame | StoredTable]) -> int:
+    # shallow size: object columns count a pointer per row, enough to tell
+    # small lookup tables from the sales table
+    return sum(int(df.memory_usage(index=False).sum()) for df in inputs.values() if isinstance(df, pd.DataFrame))
+
+def run_steps(steps: List[Step], catalog: StagingCatalog, workers: int = 1, checkpoints: List[str] | None = None) -> None:
+    checkpoints = checkpoints or []
+    deps = build_dag(steps)
+    check_inputs(steps)
+
+    seconds: Dict[int, float] = {}
+
+    def finish(index: int, outputs: Dict[str, pd.DataFrame | StoredTable], blocks: Dict[str, Blocks], elapsed: float) -> None:
+        step, _, writes = steps[index]
+        for name, df in outputs.items():
+            write_table(df, name, blocks=blocks[name])
+        seconds[index] = elapsed
+        if step.__name__ in checkpoints or "all" in checkpoints:
+            catalog.flush(writes)
+
+    def inputs(index: int) -> Dict[str, pd.DataFrame | StoredTable]:
+        # the step's catalog copies what it reads, tables kept on disk stay there
+        return {name: catalog.entry(name) for name in steps[index][1]}
+
+    def input_blocks(index: int) -> Dict[str, Blocks]:
+        return {name: catalog.table_blocks(name) for name in steps[index][1]}
+
+    def in_process(index: int) -> bool:
+        # a step fed by another step, or reading large tables, runs here on
+        # the catalog's frames: sending them to a worker would pickle them
+        return workers <= 1 or bool(deps[index]) or input_bytes(inputs(index)) > POOL_INPUT_BYTES
+
+    def run_here(index: int) -> None:
+        step, _, writes = steps[index]
+        try:
+            outputs, blocks, elapsed = run_step(step, inputs(index), input_blocks(index), writes)
+        except Exception as e:
+            raise RuntimeError(f"Transform step {step.__name__} failed: {e}") from e
+        finish(index, outputs, blocks, elapsed)
+
+    start = time.perf_counter()
+    if workers <= 1:
+        for index in range(len(steps)):
+            run_here(index)
+    else:
+        pending = list(range(len(steps)))
+        running: Dict[Future, int] = {}
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            while pending or running:
+                ready = [index for index in pending if deps[index] <= seconds.keys()]
+                local = [index for index in ready if in_process(index)]
+                for index in [index for index in ready if index not in local]:
+                    step, _, writes = steps[index]
+                    running[pool.submit(run_step, step, inputs(index), input_blocks(index), writes)] = index
+                    pending.remove(index)
+
+                # the pool works on its steps while this one runs here
+                if local:
+                    pending.remove(local[0])
+                    run_here(local[0])
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    try:
+                        outputs, blocks, elapsed = future.result()
+                    except Exception as e:
+                        # nothing downstream can run, so stop instead of draining the queue
+                        raise RuntimeError(f"Transform step {steps[index][0].__name__} failed: {e}") from e
+                    finish(index, outputs, blocks, elapsed)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    print_timings(steps, deps, seconds, time.perf_counter() - start)
+
+def critical_path(deps: List[Set[int]], seconds: Dict[int, float]) -> List[int]:
+    # longest chain of step times through the DAG
+    finish: Dict[int, float] = {}
+    previous: Dict[int, int | None] = {}
+    for index in range(len(deps)):
+        before = max(deps[index], key=lambda dep: finish[dep], default=None)
+        finish[index] = seconds[index] + (finish[before] if before is not None else 0)
+        previous[index] = before
+
+    path = []
+    index = max(finish, key=finish.get, default=None)
+    while index is not None:
+        path.append(index)
+        index = previous[index]
+    return path[::-1]
+
+def print_timings(steps: List[Step], deps: List[Set[int]], seconds: Dict[int, float], wall: float) -> None:
+    path = critical_path(deps, seconds)
+    print(f"TRANSFORM CRITICAL PATH {sum(seconds[index] for index in path):.2f}s of {wall:.2f}s wall (* = on the path)")
+    for index, (step, _, _) in enumerate(steps):
+        mark = "*" if index in path else " "
+        print(f"  {mark} {step.__name__:<30} {seconds[index]:8.2f}s")
@@ -0,0 +1,33 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+SENTIMENT_WORKERS = os.cpu_count() or 1
+BATCH_SIZE = 2000
+# below this many texts starting the pool costs more than it saves
+MIN_PARALLEL_TEXTS = 5000
+
+# one analyzer per worker process, built once by the pool initializer
+_analyzer: SentimentIntensityAnalyzer | None = None
+
+def init_analyzer() -> None:
+    global _analyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+def score_batch(texts: List[str]) -> List[float]:
+    if _analyzer is None:
+        init_analyzer()
+    return [_analyzer.polarity_scores(text)['compound'] for text in texts]
+
+def score_texts(texts: List[str], workers: int = SENTIMENT_WORKERS, batch_size: int = BATCH_SIZE) -> List[float]:
+    # compound VADER score of every text, in order
+    if workers <= 1 or len(texts) < MIN_PARALLEL_TEXTS:
+        return score_batch(texts)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    scores = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=init_analyzer) as pool:
+        for batch_scores in pool.map(score_batch, batches):
+            scores.extend(batch_scores)
+    return scores
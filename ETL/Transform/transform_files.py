@@ -1,60 +1,81 @@
+import json
+import os
+import time
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from ..Staging import TableWriter, fingerprint, iter_table, read_matching, read_table, remove_table, sales_chunk_size, stage_table, staging_catalog, table_blocks, table_exists, write_table
 
 from .helper_functions import (
-    handle_neg_values,
-    clean_id,
-    clean_date,
+    id_number,
     usd_to_dzd,
-    standarize_names,
-    remove_duplicates,
-    normalize_number
+    remove_duplicates
 )
+from .cleaning_plans import clean_chunks, clean_rows, clean_table
+from .name_matching import NameIndex
+from .scheduler import run_steps
+from .sentiment import score_texts
+
+# transformed sales, one table per month, kept between runs
+SALES_PARTITIONS_DIR = Path("cache") / "sales_by_month"
+SALES_MANIFEST_PATH = Path("cache") / "sales_by_month.json"
+# per id, a hash of the product cost / shipping rows the partitions used
+SALES_COSTS_DIR = Path("cache") / "sales_costs"
+# bump when transform_sales_partition changes so stored partitions are rebuilt
+SALES_PARTITION_VERSION = 2
+# scratch table of stream_sales between its two passes, and its output until
+# the catalog moves it into staging
+SALES_STREAM_DIR = Path("cache") / "sales_stream"
+SALES_STREAM_OUTPUT_DIR = Path("cache") / "sales_stream_output"
+
+# invoice Trans_IDs come from their own range so they never collide with ERP
+# ids, and the Order_ID -> Trans_ID map keeps them the same across runs
+INVOICE_KEY_START = 1_000_000_000
+INVOICE_KEYS_DIR = Path("cache") / "invoice_keys"
+INVOICE_KEYS_STATE_PATH = INVOICE_KEYS_DIR / "state.json"
+
+# review text hash -> compound score, and the per-product running totals
+SENTIMENT_CACHE_DIR = Path("cache") / "sentiment"
+SENTIMENT_STATE_PATH = SENTIMENT_CACHE_DIR / "state.json"
 
 def transform_marketing_expenses() -> None:
-    df = pd.read_csv("staging/marketing_expenses.csv")
+    df = read_table("marketing_expenses")
 
-    # 1) Clean date and prices
-    df = clean_date(df, "Date")
-    df = normalize_number(df, ["Marketing_Cost_USD"])
+    # 1) Clean date and prices, negatives -> NULL, standardize names
+    df = clean_table(df, "marketing_expenses")
 
     # 2) Add Month column (start of month)
     df["Month"] = df["Date"].dt.to_period("M").dt.to_timestamp()
     df["Month"] = pd.to_datetime(df["Month"], errors="coerce")
 
-    # 5) Negatives -> NULL
-    df = handle_neg_values(df, ["Marketing_Cost_USD"])
-
     # 7) Convert USD -> DZD and rename
     df = usd_to_dzd(df, "Marketing_Cost_USD")  # creates Marketing_Cost_DZD
 
-    # 3) Standardize names
-    df = standarize_names(df, ["Category", "Campaign_Type"])
-
     # 6) Fill NULL with avg of same (Category, Campaign_Type)
     df["Marketing_Cost_DZD"] = df["Marketing_Cost_DZD"].fillna(
-        df.groupby(["Category", "Campaign_Type"])["Marketing_Cost_DZD"].transform("mean")
+        df.groupby(["Category", "Campaign_Type"], observed=True)["Marketing_Cost_DZD"].transform("mean")
     )
 
     # 8) Add monthly average marketing for this Category (Month + Category)
     df["Avg_Monthly_Category_Marketing_Cost"] = df.groupby(
-        ["Month", "Category"]
+        ["Month", "Category"], observed=True
     )["Marketing_Cost_DZD"].transform("mean")
 
     # 9) Remove duplicates
     df = remove_duplicates(df)
 
-    df.to_csv("staging/marketing_expenses.csv", index=False)
+    write_table(df, "marketing_expenses")
 
 
 
 def transform_cities() -> None:
-    cities = pd.read_csv("staging/table_cities.csv")
-    shipping = pd.read_csv("staging/shipping_rates.csv") 
+    cities = read_table("table_cities")
+    shipping = read_table("shipping_rates") 
 
     # average shipping cost per region
     avg_shipping = (
-        shipping.groupby("region_name", as_index=False)["shipping_cost"]
+        shipping.groupby("region_name", as_index=False, observed=True)["shipping_cost"]
         .mean()
         .rename(columns={
             "region_name": "Region",
@@ -71,78 +92,88 @@ def transform_cities() -> None:
     avg_value = cities["Avg_Region_Shipping_Cost"].mean()
     cities["Avg_Region_Shipping_Cost"] = cities["Avg_Region_Shipping_Cost"].fillna(avg_value)
 
-    cities.to_csv("staging/table_cities.csv", index=False)
+    write_table(cities, "table_cities")
 
 def transform_monthly_targets() -> None:
-    df = pd.read_csv("staging/monthly_targets.csv")
+    df = read_table("monthly_targets")
 
     # 1) Clean Store_ID like: S1, Store_5 -> 1, 5 ...
-    df = clean_id(df, "Store_ID")
-
     # 2) Clean Month (handles "Feb-2023", "Apr-2023", "2023-01-01 00:00:00", etc.)
-    df = clean_date(df, "Month")
-
     # 3) Clean Target_Revenue (remove commas, spaces, etc.)
-    df = normalize_number(df, ["Target_Revenue"])
+    # 5) Standardize Manager_Name
+    df = clean_table(df, "monthly_targets")
 
     # 4) Fill null Target_Revenue with the average of the same store
     # (if a store has all NaNs, this will remain NaN)
     df["Target_Revenue"] = df["Target_Revenue"].fillna(
         df.groupby("Store_ID")["Target_Revenue"].transform("mean")
     )
-    # 5) Standardize Manager_Name
-    df = standarize_names(df, ["Manager_Name"])
 
     # 6) Remove duplicates
     df = remove_duplicates(df)
 
-    df.to_csv("staging/monthly_targets.csv", index=False)
+    write_table(df, "monthly_targets")
 
 def transform_subcategories() -> None:
-    sub = pd.read_csv("staging/table_subcategories.csv")
-    cat = pd.read_csv("staging/table_categories.csv")
+    sub = read_table("table_subcategories")
+    cat = read_table("table_categories")
 
-    sub = sub.merge(
-        cat[["Category_ID", "Category_Name"]],
-        on="Category_ID",
-        how="left"
-    )
+    # Category_Name is already there when the join was pushed into the extract query
+    if "Category_Name" not in sub.columns:
+        sub = sub.merge(
+            cat[["Category_ID", "Category_Name"]],
+            on="Category_ID",
+            how="left"
+        )
 
     # remove foreign key
     sub.drop(columns=["Category_ID"], inplace=True)
 
-    sub.to_csv("staging/table_subcategories.csv", index=False)
+    write_table(sub, "table_subcategories")
 
 def fix_sales_ids() -> None:
-    sales = pd.read_csv("staging/table_sales.csv")
-    sales = clean_id(sales, "Trans_ID")
-    sales.to_csv("staging/table_sales.csv", index=False)
+    sales = read_table("table_sales")
+    sales = clean_table(sales, "table_sales_ids")
+    # rows stay where they were, so the extracted blocks still hold
+    write_table(sales, "table_sales", blocks=table_blocks("table_sales"))
 
 def add_invoices() -> None:
 
-    sales = pd.read_csv("staging/table_sales.csv")
-    invoices = pd.read_csv("staging/invoices.csv")
-    products = pd.read_csv("staging/table_products.csv")
+    sales = read_table("table_sales")
+    invoices = read_table("invoices")
+    products = read_table("table_products")
 
+    check_invoice_key_range(sales["Trans_ID"])
 
-    invoices = invoices.merge(
-        products[["Product_ID", "Product_Name"]],
-        on="Product_Name",
-        how="left"
+    # ---- append into sales ----
+    sales = pd.concat([sales, invoice_sales(invoices, products)], ignore_index=True)
+
+    write_table(sales, "table_sales", blocks=table_blocks("table_sales"))
+
+def prepare_invoices() -> None:
+    # out-of-core mode: the invoice rows are kept apart and stream_sales adds
+    # them after the ERP rows
+    write_table(invoice_sales(read_table("invoices"), read_table("table_products")), "invoice_sales")
+
+def invoice_sales(invoices: pd.DataFrame, products: pd.DataFrame) -> pd.DataFrame:
+    # OCR'd names are matched to the closest product name, the score is kept
+    matches = NameIndex(products["Product_Name"]).match(invoices["Product_Name"])
+    # (Match is -1 when nothing is close enough, which reindexes to NaN)
+    invoices["Product_ID"] = products["Product_ID"].reset_index(drop=True).reindex(matches["Match"]).to_numpy()
+    invoices["Product_Match_Score"] = matches["Score"].to_numpy()
+    print(f"add_invoices: {int(matches['Score'].notna().sum())}/{len(invoices)} invoice lines matched a product")
+
+    # an invoice scanned twice is one sale: by its Order_ID, or line for line
+    # when it has none
+    repeated = (
+        (invoices["Order_ID"].notna() & invoices.duplicated(subset=["Order_ID"]))
+        | (invoices["Order_ID"].isna() & invoices.duplicated())
     )
+    if repeated.any():
+        print(f"add_invoices: dropping {int(repeated.sum())} repeated invoice rows")
+        invoices = invoices[~repeated]
 
-
-    existing_ids = pd.to_numeric(sales["Trans_ID"], errors="coerce")
-    max_id = int(existing_ids.max()) if existing_ids.notna().any() else 0
-
-    new_ids = pd.RangeIndex(start=max_id + 1, stop=max_id + 1 + len(invoices))
-    invoices["Trans_ID"] = new_ids.astype(int)
-
-    # safety: ensure no collision (very unlikely, but guaranteed)
-    existing_set = set(pd.to_numeric(sales["Trans_ID"], errors="coerce").dropna().astype(int).tolist())
-    while invoices["Trans_ID"].isin(existing_set).any():
-        max_id += len(invoices)
-        invoices["Trans_ID"] = pd.RangeIndex(start=max_id + 1, stop=max_id + 1 + len(invoices)).astype(int)
+    invoices["Trans_ID"] = allocate_invoice_keys(invoices["Order_ID"])
 
     # ---- rename / select columns to match sales ----
     invoices = invoices.rename(columns={
@@ -150,26 +181,98 @@ def add_invoices() -> None:
         "Total": "Total_Revenue",
     })
 
-    invoices_sales = invoices[[
+    return invoices[[
         "Trans_ID",
         "Date",
         "Customer_ID",
         "Product_ID",
         "Quantity",
         "Total_Revenue",
+        "Product_Match_Score",
     ]]
 
-    # ---- append into sales ----
-    sales = pd.concat([sales, invoices_sales], ignore_index=True)
-
-    sales.to_csv("staging/table_sales.csv", index=False)
+def check_invoice_key_range(trans_ids: pd.Series) -> None:
+    # ERP ids have to stay below the range invoice ids are taken from
+    existing_ids = pd.to_numeric(trans_ids, errors="coerce")
+    if existing_ids.max() >= INVOICE_KEY_START:
+        in_range = existing_ids[existing_ids >= INVOICE_KEY_START]
+        if in_range.max() <= load_invoice_high_water():
+            # ids handed out to invoices before: these are invoice rows
+            raise ValueError(
+                f"table_sales already holds {len(in_range)} invoice rows (Trans_ID {INVOICE_KEY_START}+): "
+                "staging was transformed before, extract again before transforming"
+            )
+        raise ValueError(f"ERP Trans_ID {int(existing_ids.max())} reaches the invoice key range ({INVOICE_KEY_START}+)")
+
+def allocate_invoice_keys(order_ids: pd.Series) -> pd.Series:
+    # Order_ID -> Trans_ID, stable across runs; new invoices get the next ids
+    # after the high-water mark. Only the keys of the incoming Order_IDs are
+    # read, so the cost only depends on the invoices of this run
+    order_keys = order_ids.map(order_key)
+    keys = load_invoice_keys(order_keys.dropna().unique().tolist())
+    high_water = load_invoice_high_water()
+
+    trans_ids = order_keys.map(keys)
+    new = trans_ids.isna()
+    trans_ids[new] = range(high_water + 1, high_water + 1 + int(new.sum()))
+    trans_ids = trans_ids.astype("int64")
+
+    # the ids are reserved before they are stored, so a run stopped in
+    # between never hands them out again
+    if new.any():
+        save_invoice_high_water(high_water + int(new.sum()))
+
+    # invoices without an Order_ID get an id every run, they cannot be matched
+    known = new & order_ids.notna()
+    if known.any():
+        # each part sorted by Order_ID, so lookups skip the parts whose
+        # Order_ID range cannot hold the ids looked for
+        with TableWriter("invoice_keys", INVOICE_KEYS_DIR, part=f"{high_water + 1:012d}") as writer:
+            writer.write(pd.DataFrame({
+                "Order_ID": order_keys[known].to_numpy(),
+                "Trans_ID": trans_ids[known].to_numpy()
+            }).sort_values("Order_ID", ignore_index=True))
+
+    print(f"add_invoices: {int((~new).sum())} invoices kept their Trans_ID, {int(new.sum())} new")
+    return trans_ids
+
+def load_invoice_keys(order_ids: List[str]) -> Dict[str, int]:
+    # Trans_IDs already given to these Order_IDs
+    if not table_exists("invoice_keys", INVOICE_KEYS_DIR):
+        return {}
+    table = read_matching("invoice_keys", "Order_ID", order_ids, root=INVOICE_KEYS_DIR)
+    return dict(zip(table["Order_ID"].map(order_key).tolist(), table["Trans_ID"].tolist()))
+
+def order_key(order_id):
+    # Order_IDs are keyed by text, 101.0 (a column with a missing Order_ID) as 101
+    if pd.isna(order_id):
+        return order_id
+    if isinstance(order_id, float) and order_id.is_integer():
+        return str(int(order_id))
+    return str(order_id)
+
+def load_invoice_high_water() -> int:
+    if INVOICE_KEYS_STATE_PATH.exists():
+        with open(INVOICE_KEYS_STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)["high_water"]
+    # keys written without the state file: the largest id handed out
+    if table_exists("invoice_keys", INVOICE_KEYS_DIR):
+        return int(read_table("invoice_keys", columns=["Trans_ID"], root=INVOICE_KEYS_DIR)["Trans_ID"].max())
+    return INVOICE_KEY_START - 1
+
+def save_invoice_high_water(high_water: int) -> None:
+    INVOICE_KEYS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{INVOICE_KEYS_STATE_PATH}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"high_water": high_water}, f, indent=2)
+    os.replace(tmp_path, INVOICE_KEYS_STATE_PATH)
 
 def transform_products() -> None:
-    products = pd.read_csv("staging/table_products.csv")
-    subcats = pd.read_csv("staging/table_subcategories.csv")
-    competitor = pd.read_csv("staging/competitor.csv")
+    products = read_table("table_products")
+    subcats = read_table("table_subcategories")
+    competitor = read_table("competitor")
 
-    products = clean_id(products, "Product_ID")
+    products = clean_table(products, "table_products")
 
     # 1) add SubCat_Name + Category_Name
     products = products.merge(
@@ -181,22 +284,20 @@ def transform_products() -> None:
     # 2) remove foreign key
     products.drop(columns=["SubCat_ID"], inplace=True)
 
-    # 3) add competitor price (if exists)
-    products = products.merge(
-        competitor[["Product_Name", "Unit_Price"]]
-            .rename(columns={"Unit_Price": "Competitor_Unit_Price"}),
-        on="Product_Name",
-        how="left"
-    )
+    # 3) add competitor price (if exists), from the closest scraped name
+    matches = NameIndex(competitor["Product_Name"]).match(products["Product_Name"])
+    products["Competitor_Unit_Price"] = competitor["Unit_Price"].reset_index(drop=True).reindex(matches["Match"]).to_numpy()
+    products["Competitor_Match_Score"] = matches["Score"].to_numpy()
+    print(f"transform_products: {int(matches['Score'].notna().sum())}/{len(products)} products matched a competitor price")
 
-    products.to_csv("staging/table_products.csv", index=False)
+    write_table(products, "table_products")
 
 
 def transform_customers() -> None:
-    customers = pd.read_csv("staging/table_customers.csv")
-    cities = pd.read_csv("staging/table_cities.csv")
+    customers = read_table("table_customers")
+    cities = read_table("table_cities")
 
-    customers = clean_id(customers, "Customer_ID")
+    customers = clean_table(customers, "table_customers")
 
     customers = customers.merge(
         cities[["City_ID", "City_Name", "Region", "Avg_Region_Shipping_Cost"]],
@@ -207,13 +308,13 @@ def transform_customers() -> None:
     # remove foreign key
     customers.drop(columns=["City_ID"], inplace=True)
 
-    customers.to_csv("staging/table_customers.csv", index=False)
+    write_table(customers, "table_customers")
 
 
 def transform_table_stores() -> None:
-    stores = pd.read_csv("staging/table_stores.csv")
-    cities = pd.read_csv("staging/table_cities.csv")
-    targets = pd.read_csv("staging/monthly_targets.csv")
+    stores = read_table("table_stores")
+    cities = read_table("table_cities")
+    targets = read_table("monthly_targets")
 
     # ---- add City_Name + Region ----
     stores = stores.merge(
@@ -246,41 +347,177 @@ def transform_table_stores() -> None:
     # ---- drop foreign key ----
     stores.drop(columns=["City_ID"], inplace=True)
 
-    stores.to_csv("staging/table_stores.csv", index=False)
+    write_table(stores, "table_stores")
 
 
 
 def transform_sales() -> None:
-    sales = pd.read_csv("staging/table_sales.csv")
-    products = pd.read_csv("staging/table_products.csv")
-    customers = pd.read_csv("staging/table_customers.csv")
-    marketing = pd.read_csv("staging/marketing_expenses.csv", parse_dates=["Month"])
+    sales = read_table("table_sales")
+    products = read_table("table_products")
+    customers = read_table("table_customers")
+    marketing = read_table("marketing_expenses", parse_dates=["Month"])
 
-    sales = clean_id(sales, "Customer_ID")
-    sales = clean_id(sales, "Product_ID")
-    sales = clean_date(sales, "Date")
+    product_costs = products[["Product_ID", "Unit_Cost", "Category_Name"]]
+    shipping = customers[["Customer_ID", "Avg_Region_Shipping_Cost"]]
+    monthly_cat_marketing = marketing[["Month", "Category", "Avg_Monthly_Category_Marketing_Cost"]]
 
-    # 1) month of the sale
-    sales["Month"] = pd.to_datetime(sales["Date"]).dt.to_period("M").dt.to_timestamp()
+    def month_marketing(key: str) -> pd.DataFrame:
+        months = monthly_cat_marketing["Month"]
+        return monthly_cat_marketing[months.isna() if key == "no_month" else months == pd.Timestamp(key)]
+
+    # every step below only looks at rows of the same month, so each month is
+    # a partition that is recomputed only when its rows or the product costs,
+    # shipping averages or marketing spend it uses have changed. The rows come
+    # in blocks (the extracted files of table_sales, then the rows appended to
+    # it): a month made of the same blocks as last run, with the same marketing
+    # and no changed cost rows, is reused without cleaning its rows. Only the
+    # blocks of the other months are cleaned, and those months are compared on
+    # their content
+    state = load_partition_manifest()
+    if state.get("version") != SALES_PARTITION_VERSION:
+        state = {"version": SALES_PARTITION_VERSION, "blocks": {}, "months": {}}
+    blocks = sales_blocks(sales)
+    changed_products = changed_cost_ids(product_costs, "Product_ID")
+    changed_customers = changed_cost_ids(shipping, "Customer_ID")
+
+    cleaned, month_keys = {}, {}
+    def clean_blocks(signatures) -> None:
+        todo = [(signature, start, stop) for signature, start, stop in blocks if signature in signatures and signature not in cleaned]
+        if not todo:
+            return
+        rows = clean_rows(sales, pd.concat([sales.iloc[start:stop] for _, start, stop in todo]), "table_sales")
+        rows["Month"] = pd.to_datetime(rows["Date"]).dt.to_period("M").dt.to_timestamp()
+        keys = rows["Month"].dt.strftime("%Y-%m").fillna("no_month")
+        offset = 0
+        for signature, start, stop in todo:
+            cleaned[signature] = rows.iloc[offset:offset + stop - start]
+            month_keys[signature] = keys.iloc[offset:offset + stop - start]
+            offset += stop - start
+
+    # blocks seen before know their months, new ones are cleaned to find theirs
+    clean_blocks({signature for signature, _, _ in blocks if signature not in state["blocks"]})
+    block_months = {
+        signature: sorted(month_keys[signature].unique()) if signature in cleaned else state["blocks"][signature]
+        for signature, _, _ in blocks
+    }
+    month_blocks: Dict[str, List[str]] = {}
+    for signature, _, _ in blocks:
+        for key in block_months[signature]:
+            month_blocks.setdefault(key, []).append(signature)
+
+    def unchanged(key: str) -> bool:
+        entry = state["months"].get(key)
+        if entry is None or entry["blocks"] != month_blocks[key] or not table_exists(key, SALES_PARTITIONS_DIR):
+            return False
+        if entry["marketing"] != fingerprint(month_marketing(key)) or changed_products is None or changed_customers is None:
+            return False
+        if len(changed_products) or len(changed_customers):
+            used = read_table(key, columns=["Product_ID", "Customer_ID"], root=SALES_PARTITIONS_DIR)
+            return not (used["Product_ID"].isin(changed_products).any() or used["Customer_ID"].isin(changed_customers).any())
+        return True
+
+    reused = {key for key in month_blocks if unchanged(key)}
+    clean_blocks({signature for key in month_blocks if key not in reused for signature in month_blocks[key]})
+
+    months = {}
+    partitions = []
+    recomputed = 0
+    for key in sorted(month_blocks):
+        if key in reused:
+            months[key] = state["months"][key]
+            partitions.append(read_table(key, root=SALES_PARTITIONS_DIR))
+            continue
+
+        month_sales = pd.concat([cleaned[signature][month_keys[signature] == key] for signature in month_blocks[key]])
+        marketing_rows = month_marketing(key)
+        content = fingerprint(
+            pd.DataFrame({"version": [SALES_PARTITION_VERSION]}),
+            month_sales,
+            product_costs[product_costs["Product_ID"].isin(month_sales["Product_ID"])],
+            shipping[shipping["Customer_ID"].isin(month_sales["Customer_ID"])],
+            marketing_rows
+        )
+
+        entry = state["months"].get(key)
+        if entry is not None and entry["content"] == content and table_exists(key, SALES_PARTITIONS_DIR):
+            partition = read_table(key, root=SALES_PARTITIONS_DIR)
+        else:
+            partition = transform_sales_partition(month_sales, product_costs, shipping, marketing_rows)
+            write_table(partition, key, SALES_PARTITIONS_DIR)
+            recomputed += 1
+        months[key] = {"blocks": month_blocks[key], "marketing": fingerprint(marketing_rows), "content": content}
+        partitions.append(partition)
+
+    for key in set(state["months"]) - set(months):
+        remove_table(key, SALES_PARTITIONS_DIR)
+    save_cost_ids(product_costs, "Product_ID")
+    save_cost_ids(shipping, "Customer_ID")
+    save_partition_manifest({"version": SALES_PARTITION_VERSION, "blocks": block_months, "months": months})
+    print(f"transform_sales: {recomputed} of {len(months)} month partitions recomputed, {sum(map(len, cleaned.values()))} of {len(sales)} rows cleaned")
+
+    sales = pd.concat(partitions, ignore_index=True) if partitions else empty_sales(sales, product_costs, shipping, monthly_cat_marketing)
+
+    write_table(sales, "table_sales")
+
+def sales_blocks(sales: pd.DataFrame) -> List[Tuple[str, int, int]]:
+    # (signature, start, stop) of the row blocks of table_sales: the blocks
+    # the catalog holds for it (one per file it was extracted to), then the
+    # rows the earlier steps appended (invoices), signed by their content.
+    # When the blocks are unknown (CSV staging, or a table no longer made of
+    # them) the whole table is one block
+    blocks, start = [], 0
+    for signature, rows in table_blocks("table_sales") or []:
+        blocks.append((signature, start, start + rows))
+        start += rows
+    if start > len(sales):
+        blocks, start = [], 0
+    if start < len(sales) or not blocks:
+        blocks.append((fingerprint(sales.iloc[start:]), start, len(sales)))
+    return blocks
+
+def changed_cost_ids(costs: pd.DataFrame, key: str) -> pd.Series | None:
+    # ids whose cost rows were added, removed or changed since the stored
+    # partitions were computed; None when there is nothing to compare with
+    if not table_exists(key, SALES_COSTS_DIR):
+        return None
+    current = cost_hashes(costs, key)
+    both = current.merge(read_table(key, root=SALES_COSTS_DIR), how="outer", indicator=True)
+    return both.loc[both["_merge"] != "both", key].drop_duplicates()
+
+def save_cost_ids(costs: pd.DataFrame, key: str) -> None:
+    write_table(cost_hashes(costs, key), key, SALES_COSTS_DIR)
+
+def cost_hashes(costs: pd.DataFrame, key: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        key: costs[key].to_numpy(),
+        "Row_Hash": pd.util.hash_pandas_object(costs, index=False).to_numpy()
+    })
+
+def transform_sales_partition(sales: pd.DataFrame, product_costs: pd.DataFrame, shipping: pd.DataFrame, monthly_cat_marketing: pd.DataFrame) -> pd.DataFrame:
+    sales = join_sales_costs(sales, product_costs, shipping, monthly_cat_marketing)
 
+    # count of sales rows in same Month+Category
+    sales["cat_monthly_sales"] = sales.groupby(["Month", "Category_Name"], observed=True)["Product_ID"].transform("count")
+
+    return split_marketing_cost(sales)
+
+def join_sales_costs(sales: pd.DataFrame, product_costs: pd.DataFrame, shipping: pd.DataFrame, monthly_cat_marketing: pd.DataFrame) -> pd.DataFrame:
     # 2) bring category + unit cost into sales
     sales = sales.merge(
-        products[["Product_ID", "Unit_Cost", "Category_Name"]],
+        product_costs,
         on="Product_ID",
         how="left"
     )
 
     # 3) shipping cost directly from customers
     sales = sales.merge(
-        customers[["Customer_ID", "Avg_Region_Shipping_Cost"]],
+        shipping,
         on="Customer_ID",
         how="left"
     )
     sales["Shipping_Cost"] = sales["Avg_Region_Shipping_Cost"]
 
     # 4) marketing monthly by (Month + Category)
-    monthly_cat_marketing = marketing[["Month", "Category", "Avg_Monthly_Category_Marketing_Cost"]]
-
     sales = sales.merge(
         monthly_cat_marketing,
         left_on=["Month", "Category_Name"],
@@ -290,9 +527,9 @@ def transform_sales() -> None:
 
     sales["Marketing_Cost"] = sales["Avg_Monthly_Category_Marketing_Cost"].fillna(0)
 
-    # count of sales rows in same Month+Category
-    sales["cat_monthly_sales"] = sales.groupby(["Month", "Category_Name"])["Product_ID"].transform("count")
+    return sales
 
+def split_marketing_cost(sales: pd.DataFrame) -> pd.DataFrame:
     # avoid division by zero
     sales["cat_monthly_sales"] = sales["cat_monthly_sales"].replace(0, 1)
 
@@ -308,42 +545,207 @@ def transform_sales() -> None:
 
     sales.drop(columns=["Month", "Category", "Avg_Monthly_Category_Marketing_Cost"], inplace=True, errors="ignore")
 
-    sales.to_csv("staging/table_sales.csv", index=False)
+    return sales
+
+def stream_sales() -> None:
+    # out-of-core transform_sales (SALES_CHUNK_SIZE): table_sales is read from
+    # its files chunk by chunk, with fix_sales_ids done on the way and the rows
+    # of prepare_invoices added after the ERP rows. The marketing split needs
+    # the row count of every Month + Category, so a first pass cleans, joins
+    # and counts into SALES_STREAM_DIR and a second one divides into
+    # SALES_STREAM_OUTPUT_DIR, which replaces table_sales when the catalog is
+    # flushed; until then staging keeps the extract. The month partitions are
+    # not used in this mode
+    chunk_size = sales_chunk_size()
+    products = read_table("table_products")
+    customers = read_table("table_customers")
+    marketing = read_table("marketing_expenses", parse_dates=["Month"])
+    invoices = read_table("invoice_sales")
+
+    product_costs = products[["Product_ID", "Unit_Cost", "Category_Name"]]
+    shipping = customers[["Customer_ID", "Avg_Region_Shipping_Cost"]]
+    monthly_cat_marketing = marketing[["Month", "Category", "Avg_Monthly_Category_Marketing_Cost"]]
+
+    def sales_chunks():
+        # every chunk gets the columns of the ERP rows and invoice rows together
+        columns = None
+        for chunk in iter_table("table_sales", chunk_size):
+            chunk = clean_table(chunk, "table_sales_ids")
+            check_invoice_key_range(chunk["Trans_ID"])
+            columns = columns or list(chunk.columns) + [column for column in invoices.columns if column not in chunk.columns]
+            yield chunk.reindex(columns=columns)
+        for start in range(0, len(invoices), chunk_size):
+            yield invoices.iloc[start:start + chunk_size].reindex(columns=columns or list(invoices.columns))
+
+    # 1) clean, join and count the rows of every Month + Category
+    counts = None
+    scratch = TableWriter("table_sales", SALES_STREAM_DIR)
+    for chunk in clean_chunks(sales_chunks(), "table_sales"):
+        chunk["Month"] = pd.to_datetime(chunk["Date"]).dt.to_period("M").dt.to_timestamp()
+        chunk = join_sales_costs(chunk, product_costs, shipping, monthly_cat_marketing)
+        chunk_counts = chunk.groupby(["Month", "Category_Name"], observed=True)["Product_ID"].count()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+        scratch.write(chunk)
+
+    # 2) split the marketing spend
+    with TableWriter("table_sales", SALES_STREAM_OUTPUT_DIR) as writer:
+        if counts is None:
+            # no sales and no invoices: an empty table that still has every column
+            scratch.abort()
+            sales = read_table("table_sales")
+            sales = sales.reindex(columns=list(sales.columns) + [column for column in invoices.columns if column not in sales.columns])
+            writer.write(empty_sales(clean_table(sales, "table_sales_ids"), product_costs, shipping, monthly_cat_marketing))
+        else:
+            scratch.close()
+            counts = counts.astype("int64").rename("cat_monthly_sales").reset_index()
+            for chunk in iter_table("table_sales", chunk_size, parse_dates=["Date", "Month"], root=SALES_STREAM_DIR):
+                chunk = chunk.merge(counts, on=["Month", "Category_Name"], how="left")
+                writer.write(split_marketing_cost(chunk))
+    print(f"stream_sales: {writer.rows} rows in chunks of {chunk_size}")
+    remove_table("table_sales", SALES_STREAM_DIR)
+    stage_table("table_sales", SALES_STREAM_OUTPUT_DIR)
+
+def empty_sales(sales: pd.DataFrame, product_costs: pd.DataFrame, shipping: pd.DataFrame, monthly_cat_marketing: pd.DataFrame) -> pd.DataFrame:
+    # table_sales without rows, with the columns transformed sales have
+    sales = clean_table(sales.iloc[:0].copy(), "table_sales")
+    sales["Month"] = pd.to_datetime(sales["Date"]).dt.to_period("M").dt.to_timestamp()
+    return transform_sales_partition(sales, product_costs, shipping, monthly_cat_marketing)
+
+def load_partition_manifest() -> Dict[str, str]:
+    if not SALES_MANIFEST_PATH.exists():
+        return {}
+    with open(SALES_MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_partition_manifest(manifest: Dict[str, str]) -> None:
+    SALES_MANIFEST_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{SALES_MANIFEST_PATH}.part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, SALES_MANIFEST_PATH)
 
 
 
 def review_text_to_score() -> None:
-    dataframe=pd.read_csv("staging/table_reviews.csv")
-    sid_obj=SentimentIntensityAnalyzer()
-    
-    score=[]
-    
-    for product in dataframe.groupby("Product_ID"):
-        count=0
-        sum=0
-        for sentence in product[1]["Review_Text"]:
-            sentiment_dict=sid_obj.polarity_scores(sentence)
-            count+=1
-            sum+=sentiment_dict['compound']
-        score.append(sum/count)
-    
-    dataframe=pd.read_csv("staging/table_products.csv")
-    dataframe.sort_values(by=["Product_ID"])
-    dataframe["Score"]=score
-
-    dataframe.to_csv("staging/table_products.csv",index=False)
-
-
-
-def transform_erp() -> None:
-    transform_marketing_expenses()
-    transform_cities()
-    transform_monthly_targets()
-    transform_subcategories()
-    fix_sales_ids()
-    add_invoices()
-    transform_products()
-    transform_customers()
-    transform_table_stores()
-    transform_sales()
-    review_text_to_score()
+    reviews=read_table("table_reviews")
+    products=read_table("table_products")
+
+    # reviews are matched to products on the cleaned id, not on list position
+    reviews["Product_ID"]=id_number(reviews["Product_ID"])
+
+    # reviews are append-only: when the rows scored last time are still the
+    # first rows, only the rows after them are added to the running totals
+    state=load_sentiment_state()
+    start=state["rows"]
+    sums,counts=state["sums"],state["counts"]
+    if start>len(reviews) or fingerprint(reviews.iloc[:start][["Product_ID","Review_Text"]])!=state["prefix"]:
+        start=0
+        sums,counts={},{}
+    new_reviews=reviews.iloc[start:]
+
+    # compound score per review text, so an edited table only re-scores new
+    # text; the texts not seen before are scored in one parallel batch
+    scores=load_review_scores()
+    keys=pd.util.hash_pandas_object(new_reviews["Review_Text"],index=False)
+    unseen=~keys.isin(scores.keys()) & ~keys.duplicated()
+    texts=new_reviews["Review_Text"][unseen.to_numpy()].tolist()
+    scores.update(zip(keys[unseen].tolist(),score_texts(texts)))
+
+    print(f"review_text_to_score: {len(new_reviews)} new reviews, {len(texts)} scored, {len(new_reviews)-len(texts)} from cache")
+    if texts:
+        save_review_scores(scores)
+
+    # per-product totals of the new reviews, added to the running ones
+    totals=(
+        pd.DataFrame({"Product_ID": new_reviews["Product_ID"].to_numpy(),"Compound": keys.map(scores).to_numpy()})
+        .groupby("Product_ID")["Compound"]
+        .agg(["sum","count"])
+    )
+    for product_id,product_sum,product_count in zip(totals.index.tolist(),totals["sum"].tolist(),totals["count"].tolist()):
+        sums[product_id]=sums.get(product_id,0)+product_sum
+        counts[product_id]=counts.get(product_id,0)+product_count
+    save_sentiment_state(len(reviews),fingerprint(reviews[["Product_ID","Review_Text"]]),sums,counts)
+
+    products["Score"]=products["Product_ID"].map({product_id: sums[product_id]/counts[product_id] for product_id in sums})
+
+    write_table(products, "table_products")
+
+def load_review_scores() -> Dict[int, float]:
+    if not table_exists("review_scores",SENTIMENT_CACHE_DIR):
+        return {}
+    table=read_table("review_scores",root=SENTIMENT_CACHE_DIR)
+    return dict(zip(table["Text_Hash"].tolist(),table["Compound"].tolist()))
+
+def save_review_scores(scores: Dict[int, float]) -> None:
+    write_table(pd.DataFrame({
+        "Text_Hash": pd.Series(list(scores.keys()),dtype="uint64"),
+        "Compound": pd.Series(list(scores.values()),dtype="float64")
+    }),"review_scores",SENTIMENT_CACHE_DIR)
+
+def load_sentiment_state() -> Dict:
+    if not SENTIMENT_STATE_PATH.exists() or not table_exists("product_scores",SENTIMENT_CACHE_DIR):
+        return {"rows": 0,"prefix": None,"sums": {},"counts": {}}
+    with open(SENTIMENT_STATE_PATH,"r",encoding="utf-8") as f:
+        state=json.load(f)
+    totals=read_table("product_scores",root=SENTIMENT_CACHE_DIR)
+    state["sums"]=dict(zip(totals["Product_ID"].tolist(),totals["Sum"].tolist()))
+    state["counts"]=dict(zip(totals["Product_ID"].tolist(),totals["Count"].tolist()))
+    return state
+
+def save_sentiment_state(rows: int, prefix: str, sums: Dict, counts: Dict) -> None:
+    write_table(pd.DataFrame({
+        "Product_ID": pd.Series(list(sums.keys()),dtype="float64"),
+        "Sum": pd.Series(list(sums.values()),dtype="float64"),
+        "Count": pd.Series([counts[product_id] for product_id in sums],dtype="int64")
+    }),"product_scores",SENTIMENT_CACHE_DIR)
+    tmp_path=f"{SENTIMENT_STATE_PATH}.part"
+    with open(tmp_path,"w",encoding="utf-8") as f:
+        json.dump({"rows": rows,"prefix": prefix},f,indent=2)
+    os.replace(tmp_path,SENTIMENT_STATE_PATH)
+
+
+
+# (step, staging tables it reads, staging tables it writes); the list keeps the
+# order the steps were written for, the scheduler only runs independent ones
+# side by side
+TRANSFORM_STEPS = [
+    (transform_marketing_expenses, ["marketing_expenses"], ["marketing_expenses"]),
+    (transform_cities, ["table_cities", "shipping_rates"], ["table_cities"]),
+    (transform_monthly_targets, ["monthly_targets"], ["monthly_targets"]),
+    (transform_subcategories, ["table_subcategories", "table_categories"], ["table_subcategories"]),
+    (fix_sales_ids, ["table_sales"], ["table_sales"]),
+    (add_invoices, ["table_sales", "invoices", "table_products"], ["table_sales"]),
+    (transform_products, ["table_products", "table_subcategories", "competitor"], ["table_products"]),
+    (transform_customers, ["table_customers", "table_cities"], ["table_customers"]),
+    (transform_table_stores, ["table_stores", "table_cities", "monthly_targets"], ["table_stores"]),
+    (transform_sales, ["table_sales", "table_products", "table_customers", "marketing_expenses"], ["table_sales"]),
+    (review_text_to_score, ["table_reviews", "table_products"], ["table_products"]),
+]
+
+# out-of-core mode (SALES_CHUNK_SIZE > 0): table_sales is kept on disk, never
+# loaded into the catalog, and the three sales steps become prepare_invoices
+# and stream_sales
+STREAMED_TRANSFORM_STEPS = [
+    (transform_marketing_expenses, ["marketing_expenses"], ["marketing_expenses"]),
+    (transform_cities, ["table_cities", "shipping_rates"], ["table_cities"]),
+    (transform_monthly_targets, ["monthly_targets"], ["monthly_targets"]),
+    (transform_subcategories, ["table_subcategories", "table_categories"], ["table_subcategories"]),
+    (prepare_invoices, ["invoices", "table_products"], ["invoice_sales"]),
+    (transform_products, ["table_products", "table_subcategories", "competitor"], ["table_products"]),
+    (transform_customers, ["table_customers", "table_cities"], ["table_customers"]),
+    (transform_table_stores, ["table_stores", "table_cities", "monthly_targets"], ["table_stores"]),
+    (stream_sales, ["table_sales", "invoice_sales", "table_products", "table_customers", "marketing_expenses"], ["table_sales"]),
+    (review_text_to_score, ["table_reviews", "table_products"], ["table_products"]),
+]
+
+def transform_erp(checkpoints: List[str] | None = None, workers: int = 1) -> None:
+    # steps hand their tables to each other in memory; staging on disk is
+    # written at the end, and after every step named in `checkpoints`
+    with staging_catalog() as catalog:
+        if sales_chunk_size():
+            catalog.keep_on_disk("table_sales")
+        run_steps(STREAMED_TRANSFORM_STEPS if sales_chunk_size() else TRANSFORM_STEPS, catalog, workers, checkpoints)
+
+        start = time.perf_counter()
+        catalog.flush()
+        print(f"Staging written in {time.perf_counter() - start:.2f}s")
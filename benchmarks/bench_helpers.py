@@ -0,0 +1,99 @@
+# Micro-benchmarks for ETL/Transform/helper_functions.py
+#
+#   python -m benchmarks.bench_helpers                     # 10^5, 10^6, 10^7 rows
+#   python -m benchmarks.bench_helpers --sizes 100000 --repeat 3
+#
+# Every helper runs on a synthetic frame with the column it cleans plus a few
+# untouched numeric columns, so copying the whole frame shows up in the
+# numbers. Time is the best of --repeat runs, peak memory is what tracemalloc
+# saw allocated on top of the input frame during one run.
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+
+from ETL.Transform import helper_functions
+
+SIZES = [10**5, 10**6, 10**7]
+EXTRA_COLUMNS = 8
+
+def synthetic_frame(rows: int, column: str, values: np.ndarray) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    frame = {f"extra_{i}": rng.random(rows) for i in range(EXTRA_COLUMNS)}
+    frame[column] = values
+    return pd.DataFrame(frame)
+
+def choice(rows: int, values: List) -> np.ndarray:
+    return np.random.default_rng(0).choice(np.array(values, dtype=object), rows)
+
+def cases(rows: int) -> Dict[str, Tuple[Callable[[], pd.DataFrame], Callable[[pd.DataFrame], pd.DataFrame]]]:
+    rng = np.random.default_rng(0)
+    return {
+        "handle_neg_values": (
+            lambda: synthetic_frame(rows, "Cost", rng.normal(100, 200, rows)),
+            lambda df: helper_functions.handle_neg_values(df, ["Cost"])
+        ),
+        "clean_id": (
+            lambda: synthetic_frame(rows, "Store_ID", choice(rows, ["S1", "Store_5", "7", "S12", None])),
+            lambda df: helper_functions.clean_id(df, "Store_ID")
+        ),
+        "clean_date": (
+            lambda: synthetic_frame(rows, "Date", choice(rows, [
+                (pd.Timestamp("2021-01-01") + pd.Timedelta(days=int(day))).strftime(fmt)
+                for day in range(0, 1000, 7)
+                for fmt in ("%Y-%m-%d", "%Y.%m.%d", "%m-%d-%Y", "%B %d, %Y")
+            ])),
+            lambda df: helper_functions.clean_date(df, "Date")
+        ),
+        "usd_to_dzd": (
+            lambda: synthetic_frame(rows, "Cost_USD", rng.random(rows) * 1000),
+            lambda df: helper_functions.usd_to_dzd(df, "Cost_USD")
+        ),
+        "standarize_names": (
+            lambda: synthetic_frame(rows, "Category", choice(rows, ["laptops", "social-media", "audio_", " TV ", None])),
+            lambda df: helper_functions.standarize_names(df, ["Category"])
+        ),
+        "remove_duplicates": (
+            lambda: synthetic_frame(rows, "Key", rng.integers(0, rows // 2 + 1, rows)).round(1),
+            lambda df: helper_functions.remove_duplicates(df)
+        ),
+        "normalize_number": (
+            lambda: synthetic_frame(rows, "Revenue", choice(rows, ["1 200", "3,5", "USD 40", "$7", "abc", None])),
+            lambda df: helper_functions.normalize_number(df, ["Revenue"])
+        ),
+    }
+
+def measure(make: Callable[[], pd.DataFrame], run: Callable[[pd.DataFrame], pd.DataFrame], repeat: int) -> Tuple[float, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        df = make()
+        start = time.perf_counter()
+        run(df)
+        best = min(best, time.perf_counter() - start)
+
+    df = make()
+    tracemalloc.start()
+    run(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time the transform helpers on synthetic columns")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--only", nargs="+", help="helper names to run")
+    args = parser.parse_args()
+
+    print(f"{'helper':<20} {'rows':>10} {'seconds':>10} {'peak MB':>10}")
+    for rows in args.sizes:
+        for name, (make, run) in cases(rows).items():
+            if args.only and name not in args.only:
+                continue
+            seconds, peak = measure(make, run, args.repeat)
+            print(f"{name:<20} {rows:>10} {seconds:>10.3f} {peak:>10.1f}")
+
+if __name__ == "__main__":
+    main()
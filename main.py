@@ -1,12 +1,28 @@
+import os
 from ETL.Extract import extract
 from ETL.Transform import transfrom
 from ETL.Load import load
+from ETL.Staging import export_csv
 from dotenv import dotenv_values
 
-ENV_KEYS=dotenv_values(".env")
+# the guard keeps worker processes (OCR pool) from re-running the pipeline
+# when they import this module on spawn-based platforms
+if __name__ == "__main__":
+    ENV_KEYS=dotenv_values(".env")
+    # read by the staging layer, also in worker processes
+    os.environ.setdefault("STAGING_FORMAT",ENV_KEYS.get("STAGING_FORMAT") or "parquet")
+    os.environ.setdefault("MEMORY_BUDGET",ENV_KEYS.get("MEMORY_BUDGET") or "false")
+    os.environ.setdefault("NAME_MATCH_THRESHOLD",ENV_KEYS.get("NAME_MATCH_THRESHOLD") or "0.9")
+    os.environ.setdefault("SALES_CHUNK_SIZE",ENV_KEYS.get("SALES_CHUNK_SIZE") or "0")
 
-extract(ENV_KEYS)
+    extract(ENV_KEYS)
 
-transfrom()
+    transfrom(
+        [step.strip() for step in (ENV_KEYS.get("TRANSFORM_CHECKPOINTS") or "").split(",") if step.strip()],
+        workers=int(ENV_KEYS.get("TRANSFORM_WORKERS") or 1)
+    )
 
-load()
\ No newline at end of file
+    load()
+
+    if (ENV_KEYS.get("EXPORT_CSV") or "").lower() in ("1","true","yes"):
+        export_csv()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ETL.Transform.cleaning_plans import CLEANING_PLANS, clean_chunks, clean_rows, clean_table
+from ETL.Transform.helper_functions import clean_date, clean_id, handle_neg_values, normalize_number, standarize_names
+
+pytestmark = [pytest.mark.filterwarnings("ignore:Could not infer format"), pytest.mark.filterwarnings("ignore:Parsing dates in")]
+
+IDS = ["C-12", "c_7", "S1", "Store_5", "P-001", "", None, "x"]
+DATES = ["2021-02-28", "2021.03.01", "03-15-2021", "March 3, 2021", "Feb-2023", "13-01-2021",
+         "2023-01-01 00:00:00", "not a date", "", " ", "nan", None]
+NUMBERS = ["1 234,5", "$99", "120 USD", "-40", "3,5", "", None, "abc"]
+NAMES = ["west_side", "online-ads", " tv ", "Jean-Luc", "", None]
+
+# what each table's cleaning plan replaced: the helper calls the transform
+# made on it, in order
+HELPER_CALLS = {
+    "marketing_expenses": lambda df: standarize_names(handle_neg_values(normalize_number(
+        clean_date(df, "Date"), ["Marketing_Cost_USD"]), ["Marketing_Cost_USD"]), ["Category", "Campaign_Type"]),
+    "monthly_targets": lambda df: standarize_names(normalize_number(clean_date(
+        clean_id(df, "Store_ID"), "Month"), ["Target_Revenue"]), ["Manager_Name"]),
+    "table_sales_ids": lambda df: clean_id(df, "Trans_ID"),
+    "table_sales": lambda df: clean_date(clean_id(clean_id(df, "Customer_ID"), "Product_ID"), "Date"),
+    "table_products": lambda df: clean_id(df, "Product_ID"),
+    "table_customers": lambda df: clean_id(df, "Customer_ID"),
+}
+
+COLUMN_VALUES = {
+    "Date": DATES, "Month": DATES, "Marketing_Cost_USD": NUMBERS, "Target_Revenue": NUMBERS,
+    "Category": NAMES, "Campaign_Type": NAMES, "Manager_Name": NAMES,
+}
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def messy_table(name: str, rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    columns = [column.split(":")[0].strip() for column in CLEANING_PLANS[name].split(";")]
+    df = pd.DataFrame({
+        column: rng.choice(np.array(COLUMN_VALUES.get(column, IDS), dtype=object), rows) for column in columns
+    })
+    df["Untouched"] = rng.random(rows)
+    return df
+
+def values(df: pd.DataFrame) -> pd.DataFrame:
+    # the cleaned values, whatever dtype holds them
+    return df.astype(object).where(df.notna(), None)
+
+@pytest.mark.parametrize("name", CLEANING_PLANS)
+def test_plans_clean_like_the_helper_calls(name):
+    for seed in range(20):
+        df = messy_table(name, 40, seed)
+        pd.testing.assert_frame_equal(clean_table(df.copy(), name), HELPER_CALLS[name](df.copy()))
+
+@pytest.mark.parametrize("name", ["table_sales", "marketing_expenses", "monthly_targets"])
+def test_chunks_and_row_subsets_clean_like_the_whole_table(name):
+    for seed in range(10):
+        df = messy_table(name, 30, seed)
+        # a blank and a missing date ahead of the first real one
+        date = "Date" if "Date" in df.columns else "Month"
+        df.loc[:2, date] = ["", None, "March 3, 2021"]
+        whole = clean_table(df.copy(), name)
+
+        # (chunks clean their id columns to the dtype their own values give)
+        for size in [2, 7]:
+            chunks = [df.iloc[start:start + size].copy() for start in range(0, len(df), size)]
+            chunked = pd.concat([values(chunk) for chunk in clean_chunks(chunks, name)])
+            pd.testing.assert_frame_equal(chunked, values(whole))
+
+        rows = df.iloc[np.random.default_rng(seed).permutation(len(df))[:10]]
+        pd.testing.assert_frame_equal(values(clean_rows(df, rows, name)), values(whole.loc[rows.index]))
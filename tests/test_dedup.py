@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from ETL.Staging import RowHashIndex
+
+def test_pending_batches_stay_few_sorted_runs(tmp_path):
+    index = RowHashIndex(tmp_path / "hashes")
+    rng = np.random.default_rng(0)
+    batches = [rng.integers(0, 2**63, 50, dtype=np.uint64) for _ in range(100)]
+    for batch in batches:
+        index.add_pending(batch)
+    assert len(index.pending) <= 8
+    assert all((run[1:] >= run[:-1]).all() for run in index.pending)
+
+    everything = np.concatenate(batches)
+    probes = np.concatenate([everything[::7], rng.integers(0, 2**63, 500, dtype=np.uint64)])
+    assert (index.contains(probes) == np.isin(probes, everything)).all()
+    assert not index.contains(probes, pending=False).any()
+
+    index.commit()
+    assert index.pending == [] and index.rows == len(np.unique(everything))
+    assert (index.contains(probes) == np.isin(probes, everything)).all()
+
+def test_admit_drops_rows_admitted_in_earlier_batches(tmp_path):
+    index = RowHashIndex(tmp_path / "hashes")
+    rows = pd.DataFrame({"Trans_ID": range(40), "Quantity": [1, 2] * 20})
+    for start in range(0, 40, 5):
+        assert len(index.admit(rows.iloc[start:start + 5], lambda candidates: rows.iloc[:0])) == 5
+    again = pd.concat([rows.iloc[::3], pd.DataFrame({"Trans_ID": [40, 41], "Quantity": [1, 1]})], ignore_index=True)
+    assert index.admit(again, lambda candidates: rows.iloc[:0]).Trans_ID.tolist() == [40, 41]
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ETL.Staging import TableWriter, staging_store, write_table
+from ETL.Staging.dtype_policy import column_policy, compact_column, compact_frame
+
+@pytest.mark.parametrize("column, policy", [
+    (pd.Series([1, 2, 3], name="Product_ID"), "id"),
+    (pd.Series([1.0, None], name="Store_ID"), "id"),
+    (pd.Series([True, False], name="Paid_ID"), "keep"),
+    (pd.Series(["a", "b", "a", "a"], name="Region"), "category"),
+    (pd.Series(["a", "b", "c", "a"], name="Trans_ID"), "keep"),
+    (pd.Series([1, 2, 3], name="Quantity"), "int"),
+    (pd.Series([1.5, 2.25], name="Price"), "float32"),
+    (pd.Series([True, False], name="Paid"), "keep"),
+    (pd.Series(pd.to_datetime(["2024-01-01"]), name="Date"), "keep"),
+])
+def test_column_policy(column, policy):
+    assert column_policy(column) == policy
+
+def test_compact_column_round_trips():
+    ids = pd.Series([1.0, None, 7.0])
+    assert compact_column(ids, "id").tolist() == [1, pd.NA, 7]
+    assert str(compact_column(ids, "id").dtype) == "Int32"
+    assert str(compact_column(pd.Series([1, 2**40]), "id").dtype) == "Int64"
+    # fractional values are not ids and are left alone
+    fractions = pd.Series([1.5, 2.0])
+    assert compact_column(fractions, "id") is fractions
+
+    assert compact_column(pd.Series([1, 2], dtype=np.int64), "int").dtype == np.int32
+    assert compact_column(pd.Series([1, 2**40]), "int").dtype == np.int64
+
+    exact = pd.Series([1.5, 2.25, None])
+    assert compact_column(exact, "float32").dtype == np.float32
+    pd.testing.assert_series_equal(compact_column(exact, "float32").astype(np.float64), exact)
+    assert compact_column(pd.Series([0.1, 2.0]), "float32").dtype == np.float64
+
+    text = pd.Series(["b", "a", None, "b"])
+    assert compact_column(text, "category").cat.categories.tolist() == ["a", "b"]
+    assert compact_column(text, "category").astype(object).where(text.notna(), None).tolist() == text.tolist()
+    mixed = pd.Series(["a", 1, "a"])
+    assert compact_column(mixed, "category") is mixed
+
+def sample_sales(rng):
+    n = 300
+    return pd.DataFrame({
+        "Trans_ID": [f"T{i}" for i in range(n)],
+        "Date": pd.Series(pd.date_range("2024-01-01", periods=20)).sample(n, replace=True, random_state=0).dt.strftime("%Y-%m-%d").tolist(),
+        "Customer_ID": [None if i % 7 == 0 else f"C{i % 11}" for i in range(n)],
+        "Store_ID": rng.integers(1, 6, n),
+        "Quantity": rng.integers(1, 5, n),
+        "Total_Revenue": np.round(rng.uniform(10, 900, n), 2),
+        "Weight": rng.integers(1, 9, n) / 4,
+        "Notes": [None] * n,
+        # repeats in the first batch, mostly distinct over the table
+        "Coupon": ["X"] * 100 + [f"K{i}" for i in range(n - 100)],
+    })
+
+@pytest.mark.parametrize("parts", [1, 3])
+@pytest.mark.parametrize("columns", [None, ["Customer_ID", "Date", "Total_Revenue", "Trans_ID"]])
+def test_read_time_compaction_matches_compacting_after_the_read(tmp_path, monkeypatch, parts, columns):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MEMORY_BUDGET", "true")
+    # small batches, so columns are read in several of them
+    monkeypatch.setattr(staging_store, "READ_BATCH_ROWS", 64)
+    sales = sample_sales(np.random.default_rng(0))
+    if parts == 1:
+        write_table(sales, "table_sales")
+    for number in range(parts if parts > 1 else 0):
+        with TableWriter("table_sales", part=f"part-{number:05d}") as writer:
+            writer.write(sales.iloc[number * 100:(number + 1) * 100])
+    # a stage can write compacted frames back, a chunk at a time
+    with TableWriter("compacted") as writer:
+        for start in (0, 150):
+            chunk = sales.iloc[start:start + 150].drop(columns="Coupon").reset_index(drop=True)
+            writer.write(compact_frame(chunk, "table_sales"))
+
+    for name in ("table_sales", "compacted"):
+        expected = compact_frame(staging_store.read_stored(name, columns, ["Date"]), name)
+        actual = staging_store.read_disk(name, columns, ["Date"])
+        pd.testing.assert_frame_equal(actual, expected)
+        assert isinstance(actual["Customer_ID"].dtype, pd.CategoricalDtype)
+        assert actual["Trans_ID"].dtype == object
+        if name == "table_sales" and columns is None:
+            assert actual["Coupon"].dtype == object
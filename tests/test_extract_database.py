@@ -0,0 +1,100 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from mysql.connector.constants import FieldType
+
+import mysql.connector
+
+from ETL.Extract import extract_database
+from ETL.Extract.extract_database import ERP_BASE_DIR, extract_erp, extract_incremental
+from ETL.Staging import dedup, read_table
+
+COLUMNS = ["Trans_ID", "Date", "Store_ID", "Customer_ID", "Product_ID", "Quantity", "Total_Revenue"]
+TYPES = {"Trans_ID": FieldType.LONG, "Quantity": FieldType.LONG, "Total_Revenue": FieldType.DOUBLE}
+
+def sale(trans_id: int, quantity: int = 1) -> tuple:
+    return (trans_id, "2024-01-01", "S-1", "C-1", "P-1", quantity, 10.0 * quantity)
+
+class FakeCursor:
+    # just enough of a MySQL cursor for extract_incremental over one table
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=()):
+        if "information_schema.COLUMNS" in query:
+            self.result = [(name, "int" if name in TYPES else "varchar(20)") for name in COLUMNS]
+            return
+        columns = re.findall(r"t\.`(\w+)`", query.split(" FROM ")[0])
+        rows = pd.DataFrame(self.rows, columns=COLUMNS)
+        where = re.search(r"t\.`(\w+)` (>=|>) %s", query)
+        if where:
+            values = rows[where.group(1)]
+            rows = rows[values >= params[0] if where.group(2) == ">=" else values > params[0]]
+        self.column_names = columns
+        self.description = [(name, TYPES.get(name, FieldType.VAR_STRING)) for name in columns]
+        self.result = list(rows[columns].itertuples(index=False, name=None))
+
+    def fetchall(self):
+        return self.result
+
+    def fetchmany(self, size):
+        batch, self.result = self.result[:size], self.result[size:]
+        return batch
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, buffered=True):
+        return FakeCursor(self.rows)
+
+    def close(self):
+        pass
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def extract(rows) -> pd.DataFrame:
+    extract_incremental(FakeConnection(rows), "table_sales", 2)
+    return read_table("table_sales", root=ERP_BASE_DIR)
+
+def test_rows_read_again_at_the_watermark_are_appended_once():
+    rows = [sale(1), sale(2), sale(3)]
+    assert len(extract(rows)) == 3
+
+    # a late row sharing the last Trans_ID, and a new one
+    rows += [sale(3, quantity=2), sale(4)]
+    base = extract(rows)
+    assert sorted(base[["Trans_ID", "Quantity"]].itertuples(index=False, name=None)) == [(1, 1), (2, 1), (3, 1), (3, 2), (4, 1)]
+    assert len(extract(rows)) == 5
+
+def test_a_hash_collision_does_not_drop_a_row(monkeypatch):
+    monkeypatch.setattr(dedup, "row_hashes", lambda df: np.zeros(len(df), dtype=np.uint64))
+    rows = [sale(1), sale(2)]
+    extract(rows)
+
+    rows += [sale(2, quantity=5), sale(3)]
+    base = extract(rows)
+    assert sorted(base["Trans_ID"]) == [1, 2, 2, 3]
+
+def test_the_index_of_an_empty_table_counts_as_built():
+    extract([])
+    assert dedup.RowHashIndex(ERP_BASE_DIR / "table_sales.hashes").built
+
+def test_serial_extract_reports_failed_tables(monkeypatch, capsys):
+    def extract_table(connection, table, chunk_size, incremental):
+        if table == "table_reviews":
+            raise mysql.connector.Error("lost connection")
+    monkeypatch.setattr(mysql.connector, "connect", lambda **config: FakeConnection([]))
+    monkeypatch.setattr(extract_database, "list_tables", lambda connection, database: ["table_sales", "table_reviews"])
+    monkeypatch.setattr(extract_database, "extract_table", extract_table)
+
+    failures = extract_erp("host", "erp", "user", "password", workers=1)
+    assert list(failures) == ["table_reviews"]
+    assert "ERP extraction failed for 1 table(s): table_reviews" in capsys.readouterr().out
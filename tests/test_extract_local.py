@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from ETL.Extract.extract_local import XLSX_CACHE_DIR, extract_locale
+from ETL.Staging import list_tables, read_table, table_exists
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def write_workbook(path, sheets) -> None:
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    workbook.save(path)
+
+def test_every_sheet_is_read_like_read_excel(tmp_path):
+    write_workbook(tmp_path / "book.xlsx", {
+        "sales": [["Month", "Amount"], [1.0, 2.5], [None, None], [3, None]],
+        "expenses": [["Category", "Amount"], ["ads", 10.0], ["rent", 12.75]],
+    })
+    extract_locale(tmp_path, ["book.xlsx"])
+
+    assert list_tables() == ["book", "book_expenses"]
+    for name, title in [("book", "sales"), ("book_expenses", "expenses")]:
+        expected = pd.read_excel(tmp_path / "book.xlsx", sheet_name=title)
+        pd.testing.assert_frame_equal(read_table(name), expected)
+
+def test_sheets_with_the_same_slug_do_not_collide(tmp_path):
+    write_workbook(tmp_path / "book.xlsx", {
+        "summary": [["a"], [0]],
+        "Q1-Sales": [["a"], [1]],
+        "Q1 Sales": [["a"], [2]],
+    })
+    extract_locale(tmp_path, ["book.xlsx"])
+
+    assert list_tables() == ["book", "book_q1_sales", "book_q1_sales_2"]
+    assert read_table("book_q1_sales")["a"].tolist() == [1]
+    assert read_table("book_q1_sales_2")["a"].tolist() == [2]
+
+def test_outputs_of_deleted_sheets_are_removed(tmp_path):
+    write_workbook(tmp_path / "book.xlsx", {"summary": [["a"], [0]], "old": [["a"], [1]]})
+    extract_locale(tmp_path, ["book.xlsx"])
+    assert table_exists("book_old")
+
+    write_workbook(tmp_path / "book.xlsx", {"summary": [["a"], [5]]})
+    extract_locale(tmp_path, ["book.xlsx"])
+    assert list_tables() == ["book"]
+    assert not table_exists("book_old", XLSX_CACHE_DIR)
+    assert read_table("book")["a"].tolist() == [5]
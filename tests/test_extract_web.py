@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from ETL.Extract.extract_web import PageCache, scrape, scrape_async
+
+# page 2 links to a page that does not follow the page{}.html pattern
+SITE = {
+    "/shop": ("A", "page2.html"),
+    "/shop/page2.html": ("B", "last-page.html"),
+    "/shop/last-page.html": ("C", None),
+}
+
+def page_html(product, next_href):
+    link = f'<a id="next-page-btn" href="{next_href}">next</a>' if next_href else ""
+    return (f'<html><body><h5 class="product-name">{product}</h5>'
+            f'<span class="product-price">100DZD</span>{link}</body></html>').encode()
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in SITE:
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = page_html(*SITE[self.path])
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/shop"
+    server.shutdown()
+
+def test_sync_scraper_follows_every_page(base_url):
+    products, prices, complete = scrape(base_url, PageCache(base_url))
+    assert products == ["A", "B", "C"]
+    assert complete
+
+def test_async_scraper_keeps_page_2_when_the_pattern_breaks(base_url):
+    products, prices, complete = asyncio.run(scrape_async(base_url, PageCache(base_url)))
+    assert products == ["A", "B", "C"]
+    assert prices == ["100"] * 3
+    assert complete
@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ETL.Transform import cleaning_plans, helper_functions
+from ETL.Transform.cleaning_plans import clean_chunks
+from ETL.Transform.helper_functions import clean_date, parse_dates
+
+def baseline_clean_date(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
+    # clean_date as it was before it parsed distinct values
+    df = df.copy()
+    s = df[column_name].astype(str).str.strip()
+    s = s.str.replace(r"\.", "-", regex=True)
+    parsed = pd.to_datetime(s, errors="coerce")
+    for fmt in ["%Y-%m-%d", "%m-%d-%Y", "%B %d, %Y", "%b-%Y"]:
+        mask = parsed.isna()
+        parsed.loc[mask] = pd.to_datetime(s[mask], format=fmt, errors="coerce")
+    df[column_name] = parsed
+    return df
+
+# the baseline parses some columns element by element, and says so
+pytestmark = [pytest.mark.filterwarnings("ignore:Could not infer format"), pytest.mark.filterwarnings("ignore:Parsing dates in")]
+
+DATES = ["2021-02-28", "2021.03.01", "03-15-2021", "March 3, 2021", "Feb-2023", "13-01-2021",
+         "2021/04/05", "not a date", "", " ", "nan", "NaT", None, np.nan]
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+@pytest.mark.parametrize("values", [
+    ["", None, "March 3, 2021", "13-01-2021"],
+    [" ", None, "March 3, 2021", "13-01-2021"],
+    ["", "March 3, 2021", "13-01-2021"],
+    [None, "", "2021-02-28", "03-15-2021"],
+    [np.nan, "NaT", "03-15-2021", "2021.03.01"],
+    ["NAT", "Feb-2023", "2021-02-28"],
+    [None, None, None],
+    [],
+])
+def test_parse_dates_matches_the_baseline(values):
+    df = pd.DataFrame({"Date": pd.Series(values, dtype=object)})
+    expected = baseline_clean_date(df, "Date")["Date"]
+    pd.testing.assert_series_equal(parse_dates(df["Date"]), expected)
+
+def test_parse_dates_matches_the_baseline_on_random_columns():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        values = pd.Series(rng.choice(np.array(DATES, dtype=object), rng.integers(1, 12)), dtype=object)
+        df = pd.DataFrame({"Date": values})
+        expected = baseline_clean_date(df, "Date")["Date"]
+        pd.testing.assert_series_equal(clean_date(df.copy(), "Date")["Date"], expected)
+
+def test_parsing_dates_does_no_io(capsys):
+    parse_dates(pd.Series(DATES, dtype=object), counts={})
+    assert not os.path.exists("cache")
+    assert capsys.readouterr().out == ""
+
+def test_date_formats_are_saved_once_per_table(monkeypatch):
+    saved = []
+    monkeypatch.setattr(cleaning_plans, "save_date_formats", lambda source, counts: saved.append((source, dict(counts))))
+    df = pd.DataFrame({"Customer_ID": ["C-1"] * 9, "Product_ID": ["P-1"] * 9,
+                       "Date": ["2021-02-28", "03-15-2021", "Feb-2023"] * 3})
+    chunks = [df.iloc[start:start + 3].copy() for start in range(0, 9, 3)]
+    list(clean_chunks(chunks, "table_sales"))
+
+    assert [source for source, _ in saved] == ["table_sales.Date"]
+    assert saved[0][1]["failed"] == 0
+
+def baseline_handle_neg_values(df, column_names=[]):
+    for column in column_names:
+        df[column] = df[column].apply(lambda x: x if x >= 0 else None)
+    return df
+
+def baseline_clean_id(df, column_name):
+    df[column_name] = df[column_name].astype(str).str.replace(r'\D', '', regex=True)
+    df[column_name] = pd.to_numeric(df[column_name], errors='coerce')
+    return df
+
+def baseline_standarize_names(df, column_names=[]):
+    df = df.copy()
+    for column in column_names:
+        df[column] = (
+            df[column].astype(str).str.replace("_", " ", regex=False)
+            .str.replace("-", " ", regex=False).str.strip().str.title()
+        )
+    return df
+
+def baseline_normalize_number(df, column_names):
+    df = df.copy()
+    for col in column_names:
+        s = df[col].astype("string")
+        s = s.str.replace("USD", "", regex=False).str.replace("$", "", regex=False).str.strip()
+        s = s.str.replace(" ", "", regex=False)
+        s = s.str.replace(",", ".", regex=False)
+        df[col] = pd.to_numeric(s, errors="coerce")
+    return df
+
+# columns the helpers meet: text, numbers, missing values of every kind
+COLUMNS = {
+    "text": pd.Series(["C-12", "c_7", " 1 234,5 USD", "$99", "new-york", "", None, "C-12"], dtype=object),
+    "text_nan": pd.Series(["3", np.nan, "4,5", "x", None, pd.NA, "3"], dtype=object),
+    "string": pd.Series(["P-1", None, "2 000", "p_2"], dtype="string"),
+    "int": pd.Series([3, -1, 0, 42, 3]),
+    "float": pd.Series([3.0, np.nan, -2.5, 1e6, 3.0]),
+    "nullable_int": pd.Series([3, pd.NA, -4], dtype="Int64"),
+    "bool": pd.Series([True, False, True]),
+    "category_int": pd.Series([3, None, 4, 3], dtype="category"),
+    "category_int_full": pd.Series([3, 4, 3], dtype="category"),
+    "category_text": pd.Series(["1,5", None, "west_side"], dtype="category"),
+    "empty": pd.Series([], dtype=object),
+    "all_missing": pd.Series([None, np.nan], dtype=object),
+}
+
+HELPERS = {
+    "clean_id": (lambda df: baseline_clean_id(df, "a"), lambda df: helper_functions.clean_id(df, "a")),
+    "standarize_names": (lambda df: baseline_standarize_names(df, ["a"]), lambda df: helper_functions.standarize_names(df, ["a"])),
+    "normalize_number": (lambda df: baseline_normalize_number(df, ["a"]), lambda df: helper_functions.normalize_number(df, ["a"])),
+}
+
+@pytest.mark.parametrize("helper", HELPERS)
+@pytest.mark.parametrize("column", COLUMNS)
+def test_text_helpers_match_the_baseline(helper, column):
+    baseline, current = HELPERS[helper]
+    df = pd.DataFrame({"a": COLUMNS[column], "b": range(len(COLUMNS[column]))})
+    pd.testing.assert_frame_equal(current(df.copy()), baseline(df.copy()))
+
+@pytest.mark.parametrize("column", ["int", "float", "nullable_int", "bool"])
+def test_handle_neg_values_matches_the_baseline(column):
+    df = pd.DataFrame({"a": COLUMNS[column]})
+    expected = baseline_handle_neg_values(df.copy(), ["a"])
+    pd.testing.assert_frame_equal(helper_functions.handle_neg_values(df.copy(), ["a"]), expected)
@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from ETL.Transform.transform_files import INVOICE_KEY_START, allocate_invoice_keys, check_invoice_key_range, load_invoice_keys
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+def test_order_ids_keep_their_trans_id_across_runs():
+    first = allocate_invoice_keys(pd.Series([101, 102, None]))
+    assert first.tolist() == [INVOICE_KEY_START, INVOICE_KEY_START + 1, INVOICE_KEY_START + 2]
+
+    second = allocate_invoice_keys(pd.Series([102, 103, 101]))
+    assert second.tolist() == [INVOICE_KEY_START + 1, INVOICE_KEY_START + 3, INVOICE_KEY_START]
+
+def test_only_the_incoming_order_ids_are_loaded():
+    allocate_invoice_keys(pd.Series([f"ORD-{number}" for number in range(50)]))
+    allocate_invoice_keys(pd.Series([f"ORD-{number}" for number in range(50, 80)]))
+    assert load_invoice_keys(["ORD-3", "ORD-60", "ORD-999"]) == {
+        "ORD-3": INVOICE_KEY_START + 3,
+        "ORD-60": INVOICE_KEY_START + 60,
+    }
+
+def test_invoice_rows_in_staging_are_reported_as_such():
+    trans_ids = allocate_invoice_keys(pd.Series(["ORD-1", "ORD-2"]))
+    with pytest.raises(ValueError, match="already holds 2 invoice rows"):
+        check_invoice_key_range(pd.concat([pd.Series([1, 2, 3]), trans_ids]))
+    with pytest.raises(ValueError, match="reaches the invoice key range"):
+        check_invoice_key_range(pd.Series([1, INVOICE_KEY_START + 10]))
+    check_invoice_key_range(pd.Series([1, 2, 3]))
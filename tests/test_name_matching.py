@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+
+from ETL.Transform import name_matching
+from ETL.Transform.name_matching import NameIndex, model_tokens, normalize_name, trigrams
+
+WORDS = ["samsung", "galaxy", "pro", "max", "ultra", "hp", "laptop", "ecran", "clavier", "souris", "dell", "lenovo", "thinkpad", "écran"]
+
+def random_name(rng: random.Random) -> str:
+    name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+    # a model number on most names, so names of the same model are common
+    return name + rng.choice(["", f" {rng.randint(1, 3)}", f" {rng.randint(1, 3)} GB", f" {rng.randint(1, 3)}gb"])
+
+def dice(a: set, b: set) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+def brute_force(queries, names, threshold):
+    # the first name equal once normalized, else the best name of the same
+    # model by scoring every pair, the earliest on ties
+    normalized = [normalize_name(name) for name in names]
+    grams = [set(trigrams(name)) for name in normalized]
+    matches, scores = [], []
+    for query in queries:
+        query = normalize_name(query)
+        if query and query in normalized:
+            matches.append(normalized.index(query))
+            scores.append(1.0)
+            continue
+        query_grams = set(trigrams(query))
+        all_scores = [
+            dice(query_grams, name_grams) if model_tokens(query) == model_tokens(name) else 0.0
+            for name, name_grams in zip(normalized, grams)
+        ]
+        best = int(np.argmax(all_scores)) if names else -1
+        if best >= 0 and all_scores[best] > 0 and all_scores[best] >= threshold:
+            matches.append(best)
+            scores.append(all_scores[best])
+        else:
+            matches.append(-1)
+            scores.append(np.nan)
+    return matches, scores
+
+@pytest.mark.parametrize("threshold", [0.3, 0.5, 0.8, 0.95])
+@pytest.mark.parametrize("max_pairs", [500_000, 50])
+def test_match_agrees_with_brute_force(threshold, max_pairs, monkeypatch):
+    monkeypatch.setattr(name_matching, "MAX_CANDIDATE_PAIRS", max_pairs)
+    rng = random.Random(1)
+    names = [random_name(rng) for _ in range(300)] + [None, ""]
+    queries = [random_name(rng) for _ in range(200)] + names[:50] + [None, "zzz qqq"]
+
+    result = NameIndex(names).match(queries, threshold)
+    matches, scores = brute_force(queries, names, threshold)
+    assert result["Match"].tolist() == matches
+    np.testing.assert_allclose(result["Score"].to_numpy(), scores, rtol=0, atol=1e-12)
+
+@pytest.mark.parametrize("names", [[], [None, 5.0], ["", "!!"]])
+def test_an_index_without_trigrams_matches_nothing(names):
+    result = NameIndex(names).match(["abc", None, "abc"])
+    assert result["Match"].tolist() == [-1, -1, -1]
+    assert result["Score"].isna().all()
+
+@pytest.mark.parametrize("query, name", [
+    ("Apple iPhone 14 Pro 128GB", "Apple iPhone 13 Pro 128GB"),
+    ("Apple iPhone 13 Pro 256GB", "Apple iPhone 13 Pro 128GB"),
+    ("Samsung Galaxy S23 Ultra", "Samsung Galaxy S22 Ultra"),
+    ("HP EliteBook 850 G8", "HP EliteBook 840 G8"),
+    ("Product B Model", "Product A Model"),
+    ("Dell XPS 13", "Dell XPS"),
+])
+@pytest.mark.parametrize("threshold", [None, 0.5])
+def test_other_models_never_match(query, name, threshold):
+    result = NameIndex([name]).match([query], threshold)
+    assert result["Match"].tolist() == [-1]
+
+def test_names_of_the_same_model_match():
+    names = ["Apple iPhone 13 Pro 128GB", "Apple iPhone 14 Pro 128GB", "Samsung Galaxy S23 Ultra", "HP EliteBook 840 G8", "Écran HP 24"]
+    queries = ["apple  iphone 14 pro 128 gb", "Samsung Galaxy S23 Ultr", "hp elitebook 840 g8 ", "Ecran HP-24", "Samsung Galaxy S24 Ultra"]
+    result = NameIndex(names).match(queries)
+    assert result["Match"].tolist() == [1, 2, 3, 4, -1]
+    assert result["Score"].iloc[[0, 1]].between(0.9, 1).all()
+    assert (result["Score"].iloc[[2, 3]] == 1.0).all()
+
+def test_an_exact_name_wins_over_an_earlier_equal_score():
+    # "ab ab" and "ab" have the same trigrams, only the second is the name
+    result = NameIndex(["pro ab ab", "pro ab"]).match(["Pro AB"], 0.5)
+    assert result["Match"].tolist() == [1]
@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from ETL.Staging import read_table, write_table
+from ETL.Transform import transform_files
+from ETL.Transform.transform_files import review_text_to_score
+
+REVIEWS = [
+    ("P-1", "Great laptop, fast and quiet."),
+    ("P-2", "The mouse broke after a week. Terrible."),
+    ("P-1", "Battery life is disappointing."),
+    ("P-3", "It works."),
+]
+
+@pytest.fixture
+def scored(tmp_path, monkeypatch):
+    # texts score_texts was asked to score, run by run
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    score_texts = transform_files.score_texts
+    def counting(texts):
+        calls.append(list(texts))
+        return score_texts(texts)
+    monkeypatch.setattr(transform_files, "score_texts", counting)
+    return calls
+
+def write_inputs(reviews) -> None:
+    write_table(pd.DataFrame({"Product_ID": [1, 2, 3, 4], "Product_Name": ["Laptop", "Mouse", "Screen", "Cable"]}), "table_products")
+    write_table(pd.DataFrame(reviews, columns=["Product_ID", "Review_Text"]), "table_reviews")
+
+def expected_scores(reviews) -> pd.Series:
+    # mean compound score of each product's reviews, NaN without reviews
+    analyzer = SentimentIntensityAnalyzer()
+    reviews = pd.DataFrame(reviews, columns=["Product_ID", "Review_Text"])
+    reviews["Product_ID"] = reviews["Product_ID"].str.replace("P-", "").astype(int)
+    reviews["Compound"] = [analyzer.polarity_scores(text)["compound"] for text in reviews["Review_Text"]]
+    return pd.Series([1, 2, 3, 4]).map(reviews.groupby("Product_ID")["Compound"].mean())
+
+def scores() -> pd.Series:
+    return read_table("table_products")["Score"]
+
+def test_scores_are_attached_by_product_id(scored):
+    write_inputs(REVIEWS)
+    review_text_to_score()
+    pd.testing.assert_series_equal(scores(), expected_scores(REVIEWS), check_names=False)
+    # the cable has no reviews
+    assert pd.isna(scores().iloc[3])
+
+def test_new_reviews_are_added_to_the_existing_scores(scored):
+    write_inputs(REVIEWS)
+    review_text_to_score()
+    scored.clear()
+
+    # more reviews for a scored product, and the first one of the cable
+    reviews = REVIEWS + [("P-2", "Actually it is fine now, love it!"), ("P-4", "Too short."), ("P-1", "It works.")]
+    write_inputs(reviews)
+    review_text_to_score()
+    # only the new texts are scored, "It works." comes from the cache
+    assert scored == [["Actually it is fine now, love it!", "Too short."]]
+    pd.testing.assert_series_equal(scores(), expected_scores(reviews), check_names=False)
+
+def test_edited_reviews_are_totalled_again(scored):
+    write_inputs(REVIEWS)
+    review_text_to_score()
+
+    reviews = [("P-3", "It works.")] + REVIEWS[1:]
+    write_inputs(reviews)
+    review_text_to_score()
+    pd.testing.assert_series_equal(scores(), expected_scores(reviews), check_names=False)
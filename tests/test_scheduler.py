@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ETL.Staging import read_table, staging_catalog, table_exists, write_table
+from ETL.Transform import scheduler
+from ETL.Transform.scheduler import build_dag, critical_path, run_steps
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_table(pd.DataFrame({"step": ["extract"], "pid": [0]}), "raw")
+
+def record(source: str, target: str, step: str) -> None:
+    # appends which step ran, and in which process, to what it read
+    df = read_table(source)
+    write_table(pd.concat([df, pd.DataFrame({"step": [step], "pid": [os.getpid()]})], ignore_index=True), target)
+
+def clean_raw():
+    record("raw", "clean", "clean_raw")
+
+def summarize():
+    record("clean", "summary", "summarize")
+
+def rank():
+    record("clean", "ranking", "rank")
+
+def lookup():
+    record("raw", "lookup", "lookup")
+
+def fail():
+    raise ValueError("broken input")
+
+STEPS = [
+    (clean_raw, ["raw"], ["clean"]),
+    (lookup, ["raw"], ["lookup"]),
+    (summarize, ["clean"], ["summary"]),
+    (rank, ["clean", "lookup"], ["ranking"]),
+]
+
+def test_steps_wait_for_the_tables_they_read_and_overwrite():
+    steps = STEPS + [(fail, ["summary"], ["clean"])]
+    assert build_dag(steps) == [set(), set(), {0}, {0, 1}, {0, 2, 3}]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_steps_run_after_their_inputs(workers):
+    with staging_catalog() as catalog:
+        run_steps(STEPS, catalog, workers)
+    assert read_table("summary")["step"].tolist() == ["extract", "clean_raw", "summarize"]
+    assert read_table("ranking")["step"].tolist() == ["extract", "clean_raw", "rank"]
+
+def test_only_independent_small_steps_leave_the_process(monkeypatch):
+    with staging_catalog() as catalog:
+        run_steps(STEPS, catalog, workers=2)
+    pids = {name: read_table(name)["pid"].iloc[-1] for name in ["clean", "lookup", "summary", "ranking"]}
+    assert pids["clean"] != os.getpid() and pids["lookup"] != os.getpid()
+    assert pids["summary"] == pids["ranking"] == os.getpid()
+
+    # the same independent steps stay here once their input counts as large
+    monkeypatch.setattr(scheduler, "POOL_INPUT_BYTES", 0)
+    with staging_catalog() as catalog:
+        run_steps(STEPS, catalog, workers=2)
+    assert read_table("lookup")["pid"].iloc[-1] == os.getpid()
+
+def test_critical_path_follows_the_slowest_chain():
+    deps = build_dag(STEPS)
+    assert critical_path(deps, {0: 1.0, 1: 5.0, 2: 1.0, 3: 1.0}) == [1, 3]
+    assert critical_path(deps, {0: 3.0, 1: 1.0, 2: 2.0, 3: 1.0}) == [0, 2]
+    assert critical_path([], {}) == []
+
+def test_a_failed_run_keeps_only_the_checkpointed_tables():
+    steps = STEPS + [(fail, ["summary"], ["failed"])]
+    with pytest.raises(RuntimeError, match="fail failed: broken input"):
+        with staging_catalog() as catalog:
+            run_steps(steps, catalog, checkpoints=["summarize"])
+    assert table_exists("summary")
+    assert not table_exists("clean") and not table_exists("ranking")
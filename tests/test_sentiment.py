@@ -0,0 +1,39 @@
+import pandas as pd
+import pytest
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from ETL.Staging import write_table
+from ETL.Transform import sentiment, transform_files
+from ETL.Transform.sentiment import score_texts
+from ETL.Transform.transform_files import SENTIMENT_STATE_PATH, review_text_to_score
+
+TEXTS = ["Great laptop, fast and quiet.", "The mouse broke after a week. Terrible.", "It works.",
+         "Battery life is disappointing.", "", "LOVE IT!!! :)", "not bad, not great"] * 5
+
+def test_pooled_scores_equal_serial_vader(monkeypatch):
+    monkeypatch.setattr(sentiment, "MIN_PARALLEL_TEXTS", 0)
+    analyzer = SentimentIntensityAnalyzer()
+    expected = [analyzer.polarity_scores(text)["compound"] for text in TEXTS]
+
+    assert score_texts(TEXTS, workers=1) == expected
+    # batches smaller than the input, and more of them than workers
+    assert score_texts(TEXTS, workers=2, batch_size=4) == expected
+
+def test_cached_review_scores_are_reused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    def counting(texts):
+        calls.append(list(texts))
+        return score_texts(texts)
+    monkeypatch.setattr(transform_files, "score_texts", counting)
+    write_table(pd.DataFrame({"Product_ID": [1, 2]}), "table_products")
+    write_table(pd.DataFrame({"Product_ID": [1, 2, 2], "Review_Text": TEXTS[:3]}), "table_reviews")
+    review_text_to_score()
+    assert calls == [TEXTS[:3]]
+
+    # the running totals are gone, every review is totalled again, but the
+    # texts are not scored again
+    SENTIMENT_STATE_PATH.unlink()
+    write_table(pd.DataFrame({"Product_ID": [1, 2]}), "table_products")
+    review_text_to_score()
+    assert calls == [TEXTS[:3], []]
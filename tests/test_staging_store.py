@@ -0,0 +1,19 @@
+import io
+
+import pandas as pd
+
+from ETL.Staging import infer_dtypes
+
+def test_infer_dtypes_matches_the_csv_round_trip():
+    df = pd.DataFrame({
+        "Order_ID": ["1", "2", " 3"],
+        "Price": ["1.5", "", None],
+        "Product": ["x", "", "y"],
+        "Paid": ["True", "False", "True"],
+        "Note": [None, None, None],
+        "Code": ["12", "007", "x"],
+        "Quantity": [1, 2, 3],
+        "Total": ["1e3", "2", "3"],
+    })
+    expected = pd.read_csv(io.StringIO(df.to_csv(index=False)))
+    pd.testing.assert_frame_equal(infer_dtypes(df), expected)
@@ -0,0 +1,212 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from ETL.Staging import TableWriter, copy_table, read_table, staging_catalog, stored_blocks, table_parts, write_table
+from ETL.Transform import transform_files
+from ETL.Transform.scheduler import run_steps
+from ETL.Transform.transform_files import add_invoices, fix_sales_ids, prepare_invoices, stream_sales, transform_sales
+
+MONTHS = ["2024-01", "2024-02", "2024-03", "2024-04"]
+ERP_DIR = Path("erp")
+
+def sales_part(month: str, first_id: int, rows: int = 6) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Trans_ID": range(first_id, first_id + rows),
+        "Date": [f"{month}-{day + 1:02d}" for day in range(rows)],
+        "Store_ID": ["S-1"] * rows,
+        "Customer_ID": [f"C-{day % 3 + 1}" for day in range(rows)],
+        "Product_ID": [f"P-{day % 2 + 1}" for day in range(rows)],
+        "Quantity": [day + 1 for day in range(rows)],
+        "Total_Revenue": [100.0 * (day + 1) for day in range(rows)],
+    })
+
+def write_inputs(months) -> None:
+    write_table(pd.DataFrame({
+        "Product_ID": [1, 2],
+        "Product_Name": ["Laptop", "Mouse"],
+        "Unit_Cost": [50.0, 5.0],
+        "Category_Name": ["Computers", "Accessories"],
+    }), "table_products")
+    write_table(pd.DataFrame({"Customer_ID": [1, 2, 3], "Avg_Region_Shipping_Cost": [3.0, 4.0, 5.0]}), "table_customers")
+    write_table(pd.DataFrame({
+        "Month": pd.to_datetime([f"{month}-01" for month in MONTHS for _ in range(2)]),
+        "Category": ["Computers", "Accessories"] * len(MONTHS),
+        "Avg_Monthly_Category_Marketing_Cost": [30.0, 12.0] * len(MONTHS),
+    }), "marketing_expenses")
+    # one extracted part per month, added run by run and copied into staging
+    # the way the incremental ERP extract does it
+    for number, month in enumerate(months):
+        if not (ERP_DIR / "table_sales" / f"part-{number:05d}.parquet").exists():
+            with TableWriter("table_sales", ERP_DIR, part=f"part-{number:05d}") as writer:
+                writer.write(sales_part(month, 100 * number))
+    copy_table("table_sales", ERP_DIR)
+
+@pytest.fixture
+def recomputed(tmp_path, monkeypatch):
+    # months of every partition transform_sales recomputes
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    partition = transform_files.transform_sales_partition
+    def counting(sales, *args):
+        calls.append(sorted(sales["Month"].dt.strftime("%Y-%m").unique()))
+        return partition(sales, *args)
+    monkeypatch.setattr(transform_files, "transform_sales_partition", counting)
+    return calls
+
+@pytest.fixture
+def cleaned(monkeypatch):
+    # number of sales rows transform_sales cleans
+    rows = []
+    clean_rows = transform_files.clean_rows
+    def counting(df, subset, *args):
+        rows.append(len(subset))
+        return clean_rows(df, subset, *args)
+    monkeypatch.setattr(transform_files, "clean_rows", counting)
+    return rows
+
+def fresh_result() -> pd.DataFrame:
+    shutil.rmtree("cache", ignore_errors=True)
+    copy_table("table_sales", ERP_DIR)
+    transform_sales()
+    return read_table("table_sales")
+
+def test_only_months_of_new_parts_are_cleaned_and_recomputed(recomputed, cleaned):
+    write_inputs(MONTHS[:3])
+    transform_sales()
+    assert len(recomputed) == 3
+
+    recomputed.clear()
+    cleaned.clear()
+    write_inputs(MONTHS)
+    transform_sales()
+    assert recomputed == [["2024-04"]]
+    assert sum(cleaned) == len(sales_part(MONTHS[3], 0))
+    incremental = read_table("table_sales")
+
+    pd.testing.assert_frame_equal(incremental, fresh_result())
+
+def test_unchanged_parts_are_not_cleaned(recomputed, cleaned):
+    write_inputs(MONTHS)
+    transform_sales()
+    recomputed.clear()
+    cleaned.clear()
+
+    write_inputs(MONTHS)
+    transform_sales()
+    assert recomputed == []
+    assert cleaned == []
+
+def test_months_using_a_changed_cost_are_recomputed(recomputed):
+    write_inputs(MONTHS)
+    transform_sales()
+    recomputed.clear()
+
+    write_inputs(MONTHS)
+    marketing = read_table("marketing_expenses")
+    marketing.loc[marketing["Month"] == "2024-02-01", "Avg_Monthly_Category_Marketing_Cost"] = 99.0
+    write_table(marketing, "marketing_expenses")
+    transform_sales()
+    assert recomputed == [["2024-02"]]
+
+    recomputed.clear()
+    write_inputs(MONTHS)
+    products = read_table("table_products")
+    products.loc[products["Product_ID"] == 2, "Unit_Cost"] = 6.0
+    write_table(products, "table_products")
+    transform_sales()
+    assert len(recomputed) == len(MONTHS)
+    changed = read_table("table_sales")
+
+    pd.testing.assert_frame_equal(changed, fresh_result())
+
+SALES_STEPS = [
+    (fix_sales_ids, ["table_sales"], ["table_sales"]),
+    (add_invoices, ["table_sales", "invoices", "table_products"], ["table_sales"]),
+    (transform_sales, ["table_sales", "table_products", "table_customers", "marketing_expenses"], ["table_sales"]),
+]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_months_are_reused_through_a_checkpointed_catalog(recomputed, workers):
+    # the earlier steps rewrite table_sales, and the checkpoints put it on
+    # disk as one new file: the extracted blocks come along with it
+    write_invoices(2)
+    write_inputs(MONTHS[:3])
+    extracted = stored_blocks("table_sales")
+    with staging_catalog() as catalog:
+        run_steps(SALES_STEPS[:2], catalog, workers, checkpoints=["all"])
+        assert stored_blocks("table_sales") == extracted
+        run_steps(SALES_STEPS[2:], catalog)
+    assert len(recomputed) == 3
+
+    recomputed.clear()
+    write_inputs(MONTHS)
+    with staging_catalog() as catalog:
+        run_steps(SALES_STEPS, catalog, workers, checkpoints=["all"])
+    assert recomputed == [["2024-04"]]
+
+def write_invoices(orders: int) -> None:
+    write_table(pd.DataFrame({
+        "Order_ID": [f"ORD-{number}" for number in range(orders)],
+        "Date": [f"2024-0{number % 4 + 1}-15" for number in range(orders)],
+        "Customer_ID": [number % 3 + 1 for number in range(orders)],
+        "Product_Name": ["Laptop" if number % 2 else "mouse" for number in range(orders)],
+        "Qte": [1] * orders,
+        "Total": [120.0] * orders,
+    }, columns=["Order_ID", "Date", "Customer_ID", "Product_Name", "Qte", "Total"]), "invoices")
+
+def streamed_and_in_memory(monkeypatch):
+    # table_sales from stream_sales, then from the in-memory steps over the
+    # same extract
+    monkeypatch.setenv("SALES_CHUNK_SIZE", "4")
+    prepare_invoices()
+    stream_sales()
+    streamed = read_table("table_sales")
+
+    copy_table("table_sales", ERP_DIR)
+    fix_sales_ids()
+    add_invoices()
+    transform_sales()
+    in_memory = read_table("table_sales")
+    return streamed, in_memory
+
+def test_streamed_sales_match_transform_sales(recomputed, monkeypatch):
+    write_inputs(MONTHS)
+    write_invoices(5)
+    streamed, in_memory = streamed_and_in_memory(monkeypatch)
+
+    assert len(streamed) == 4 * 6 + 5
+    pd.testing.assert_frame_equal(
+        streamed.sort_values("Trans_ID", ignore_index=True),
+        in_memory.sort_values("Trans_ID", ignore_index=True)
+    )
+
+def test_streaming_no_sales_writes_an_empty_table(recomputed, monkeypatch):
+    write_inputs([])
+    with TableWriter("table_sales", ERP_DIR, part="part-00000") as writer:
+        writer.write(sales_part(MONTHS[0], 0, rows=0))
+    copy_table("table_sales", ERP_DIR)
+    write_invoices(0)
+    streamed, in_memory = streamed_and_in_memory(monkeypatch)
+
+    assert streamed.empty
+    assert list(streamed.columns) == list(in_memory.columns)
+    assert "Net_Profit" in streamed.columns
+
+def test_streamed_sales_replace_the_extract_only_on_flush(recomputed, monkeypatch):
+    write_inputs(MONTHS)
+    write_invoices(5)
+    monkeypatch.setenv("SALES_CHUNK_SIZE", "4")
+    prepare_invoices()
+
+    with pytest.raises(RuntimeError):
+        with staging_catalog() as catalog:
+            catalog.keep_on_disk("table_sales")
+            stream_sales()
+            raise RuntimeError("a later step failed")
+    # the run failed: staging still holds the extract, and a new run can read it
+    assert table_parts("table_sales")
+    stream_sales()
+    assert len(read_table("table_sales")) == 4 * 6 + 5